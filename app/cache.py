@@ -0,0 +1,268 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class CacheBackend:
+    """
+    Shared, persistent storage behind a TTLCache.
+
+    Entries live in namespaces and carry wall-clock expiry times, so every
+    process on the machine agrees on what is fresh. Values are JSON strings;
+    the TTLCache in front of a backend encodes and decodes them.
+
+    The methods block. Async code runs them on `executor("read")` or
+    `executor("write")`. Each is a single thread per process, so lookups never
+    queue behind slow writes and writes are applied in the order they were queued.
+    """
+
+    def __init__(self):
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._executors_pid: Optional[int] = None
+        self._executors_lock = threading.Lock()
+
+    def executor(self, role: str) -> ThreadPoolExecutor:
+        """The thread this process runs `role` ("read" or "write") operations on"""
+        with self._executors_lock:
+            # Threads don't survive a fork, so forked workers start their own
+            if self._executors_pid != os.getpid():
+                self._executors = {}
+                self._executors_pid = os.getpid()
+            executor = self._executors.get(role)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"store-{role}")
+                self._executors[role] = executor
+            return executor
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until the writes queued so far have been applied"""
+        self.executor("write").submit(lambda: None).result(timeout)
+
+    def shutdown(self):
+        """Apply queued writes and stop this process's backend threads"""
+        with self._executors_lock:
+            executors = list(self._executors.values()) if self._executors_pid == os.getpid() else []
+            self._executors = {}
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[str, float, float]]:
+        """(value, fresh_until, stale_until) or None"""
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: str, fresh_until: float, stale_until: float):
+        raise NotImplementedError
+
+    def set_many(self, namespace: str, items: Iterable[Tuple[str, str]], fresh_until: float, stale_until: float):
+        for key, value in items:
+            self.set(namespace, key, value, fresh_until, stale_until)
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def clear(self, namespace: str):
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> Iterator[Tuple[str, str]]:
+        """Unexpired (key, value) pairs of a namespace"""
+        raise NotImplementedError
+
+    def compact(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class TTLCache:
+    """
+    Size-bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Every entry has a fresh window (`ttl`) followed by an optional stale window
+    (`stale_ttl`). `get` reports which window a hit landed in so callers can
+    serve stale values immediately while refreshing them in the background.
+
+    With a `backend`, the cache is the first level in front of shared persistent
+    storage: writes go to both, and local misses are looked up in the backend
+    (under `namespace`) so restarted or sibling worker processes start warm.
+    `encode`/`decode` convert values to and from JSON-compatible data. Backend
+    writes are queued to the backend's writer thread; use `aget` on the event
+    loop so a local miss is looked up on the backend's reader thread.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300.0, stale_ttl: float = 0.0,
+                 backend: Optional[CacheBackend] = None, namespace: str = "default",
+                 encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.backend_hits = 0
+        self.backend_errors = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """
+        Return (value, state) where state is one of FRESH, STALE or MISS. A local
+        miss reads the backend on the calling thread; async code uses `aget`.
+        """
+        entry = self._local(key)
+        if entry is None and self.backend is not None:
+            try:
+                row = self._read(key)
+            except Exception as e:
+                row = self._read_failed(e)
+            entry = self._adopt(key, row)
+        return self._result(key, entry)
+
+    async def aget(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """Like `get`, with a local miss looked up on the backend's reader thread"""
+        entry = self._local(key)
+        if entry is None and self.backend is not None:
+            try:
+                row = await asyncio.get_running_loop().run_in_executor(self.backend.executor("read"), self._read, key)
+            except Exception as e:
+                row = self._read_failed(e)
+            # A set while the lookup was running is newer than what was read
+            entry = self._local(key) or self._adopt(key, row)
+        return self._result(key, entry)
+
+    def _local(self, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() >= entry[2]:
+            # Fully expired, drop it so it stops taking up a slot
+            del self._entries[key]
+            entry = None
+        return entry
+
+    def _result(self, key: Hashable, entry: Optional[Tuple[Any, float, float]]) -> Tuple[Optional[Any], str]:
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        value, fresh_until, stale_until = entry
+
+        self._entries.move_to_end(key)
+        if time.monotonic() < fresh_until:
+            self.hits += 1
+            return value, FRESH
+        self.stale_hits += 1
+        return value, STALE
+
+    def _read(self, key: Hashable) -> Optional[Tuple[Any, float, float, float]]:
+        """The backend's unexpired entry for a key, decoded, plus the wall-clock time it was read"""
+        row = self.backend.get(self.namespace, self._backend_key(key))
+        if row is None:
+            return None
+        value, fresh_until, stale_until = row
+        wall = time.time()
+        if wall >= stale_until:
+            return None
+        value = json.loads(value)
+        return (self.decode(value) if self.decode else value), fresh_until, stale_until, wall
+
+    def _read_failed(self, error: Exception) -> None:
+        self.backend_errors += 1
+        logger.error(f"Cache backend read failed for {self.namespace}: {str(error)}")
+        return None
+
+    def _adopt(self, key: Hashable, row: Optional[Tuple[Any, float, float, float]]) -> Optional[Tuple[Any, float, float]]:
+        """Store an entry read from the backend in the local cache"""
+        if row is None:
+            return None
+        value, fresh_until, stale_until, wall = row
+        # Translate the shared wall-clock expiry into this process's monotonic clock
+        now = time.monotonic()
+        entry = (value, now + fresh_until - wall, now + stale_until - wall)
+        self._store_local(key, entry)
+        self.backend_hits += 1
+        return entry
+
+    @staticmethod
+    def _backend_key(key: Hashable) -> str:
+        return key if isinstance(key, str) else repr(key)
+
+    def _store_local(self, key: Hashable, entry: Tuple[Any, float, float]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.monotonic()
+        self._store_local(key, (value, now + ttl, now + ttl + stale_ttl))
+        if self.backend is not None:
+            wall = time.time()
+            self._queue_write("write", self._write, key, value, wall + ttl, wall + ttl + stale_ttl)
+
+    def _write(self, key: Hashable, value: Any, fresh_until: float, stale_until: float):
+        encoded = json.dumps(self.encode(value) if self.encode else value)
+        self.backend.set(self.namespace, self._backend_key(key), encoded, fresh_until, stale_until)
+
+    def _queue_write(self, action: str, fn: Callable, *args):
+        """Run a backend write on the writer thread, logging rather than raising failures"""
+        def done(future: Future):
+            error = future.exception() if not future.cancelled() else None
+            if error is not None:
+                self.backend_errors += 1
+                logger.error(f"Cache backend {action} failed for {self.namespace}: {str(error)}")
+        try:
+            self.backend.executor("write").submit(fn, *args).add_done_callback(done)
+        except RuntimeError as e:
+            # The backend has been shut down
+            self.backend_errors += 1
+            logger.error(f"Cache backend {action} failed for {self.namespace}: {str(e)}")
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+        if self.backend is not None:
+            self._queue_write("delete", self.backend.delete, self.namespace, self._backend_key(key))
+
+    def clear(self):
+        self._entries.clear()
+        if self.backend is not None:
+            self._queue_write("clear", self.backend.clear, self.namespace)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "backend": self.namespace if self.backend is not None else None,
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend_errors,
+        }
@@ -0,0 +1,121 @@
+from typing import Dict, Optional, Tuple
+import os
+import time
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# What allow() hands out: the breaker generation the call was admitted in, and whether it is the probe
+Admission = Tuple[int, bool]
+
+
+class CircuitBreaker:
+    """
+    Stop calling a platform that keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and `allow()`
+    refuses calls for `reset_timeout` seconds. Then it goes half-open and lets a
+    single probe through: a success closes it, a failure opens it again. Outcomes
+    that say nothing about the platform (the call was cancelled or never sent)
+    are recorded as None and only free the probe slot.
+
+    `allow()` returns an admission that the caller passes back to `record()`.
+    Every time the breaker opens it starts a new generation, and outcomes of
+    calls admitted in an earlier one are ignored, so a slow call from before the
+    breaker opened can't free the probe slot, close the breaker or reopen it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.generation = 0
+        self._probing = False
+        self.opens = 0
+        self.rejected = 0
+        self.last_failure: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, platform: str) -> "CircuitBreaker":
+        def setting(name: str, default: str) -> str:
+            return os.getenv(f"{name}_{platform.upper()}", os.getenv(name, default))
+        return cls(
+            platform,
+            failure_threshold=int(setting("CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(setting("CIRCUIT_RESET_SECONDS", "30")),
+        )
+
+    def allow(self) -> Optional[Admission]:
+        """
+        An admission if a call may go out now, None if not. In half-open state
+        this claims the probe.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return None
+            self.state = HALF_OPEN
+            logger.info(f"{self.name} circuit half-open, probing")
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                return None
+            self._probing = True
+            return self.generation, True
+        return self.generation, False
+
+    def record(self, admission: Admission, success: Optional[bool], detail: Optional[str] = None):
+        generation, probe = admission
+        if generation != self.generation:
+            # Admitted before the breaker last opened
+            return
+        if probe:
+            self._probing = False
+        elif self.state != CLOSED:
+            return
+        if success is None:
+            return
+        if success:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        self.last_failure = detail
+        if probe or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.generation += 1
+            self.opens += 1
+            logger.warning(f"{self.name} circuit open after {self.consecutive_failures} consecutive failures ({detail})")
+
+    def retry_in(self) -> Optional[float]:
+        """Seconds until an open breaker lets a probe through"""
+        if self.state != OPEN:
+            return None
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict:
+        retry_in = self.retry_in()
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_s": round(retry_in, 1) if retry_in is not None else None,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "last_failure": self.last_failure,
+        }
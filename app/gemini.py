@@ -0,0 +1,135 @@
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+_lock = threading.Lock()
+_genai = None
+_models: Dict[str, Any] = {}
+_init_seconds: Optional[float] = None
+_rest_executor: Optional[ThreadPoolExecutor] = None
+
+
+class GeminiNotConfigured(RuntimeError):
+    pass
+
+
+class _RestModel:
+    """
+    GenerativeModel over the REST transport. The SDK's async client can't drive
+    that transport (its calls return responses instead of awaitables), so the
+    async methods run the blocking client in a dedicated thread pool, sized by
+    GEMINI_REST_MAX_THREADS since it caps concurrent Gemini calls.
+    """
+
+    def __init__(self, model):
+        self._model = model
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    async def generate_content_async(self, *args, stream: bool = False, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = lambda: self._model.generate_content(*args, stream=stream, **kwargs)
+        response = await loop.run_in_executor(_get_rest_executor(), call)
+        return _iterate_in_executor(response) if stream else response
+
+
+async def _iterate_in_executor(chunks: Iterable) -> AsyncIterator:
+    loop = asyncio.get_running_loop()
+    iterator = iter(chunks)
+    done = object()
+    while True:
+        chunk = await loop.run_in_executor(_get_rest_executor(), next, iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def _get_rest_executor() -> ThreadPoolExecutor:
+    global _rest_executor
+    if _rest_executor is None:
+        _rest_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("GEMINI_REST_MAX_THREADS", "64")),
+            thread_name_prefix="gemini-rest"
+        )
+    return _rest_executor
+
+
+def _configure():
+    """
+    Import and configure the Gemini SDK on first use. The SDK is the single most
+    expensive import in the app, so nothing imports it at module load.
+    """
+    global _genai, _init_seconds
+    if _genai is not None:
+        return _genai
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise GeminiNotConfigured("GEMINI_API_KEY not found in environment variables")
+
+    start = time.perf_counter()
+    import google.generativeai as genai
+
+    options: Dict[str, Any] = {"api_key": api_key}
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        # e.g. a local fake for load tests; gRPC needs a real Google endpoint
+        options["transport"] = "rest"
+        options["client_options"] = {"api_endpoint": endpoint}
+    genai.configure(**options)
+    _genai = genai
+    _init_seconds = time.perf_counter() - start
+    logger.info(f"Configured Gemini in {_init_seconds * 1000:.0f}ms" + (f" (endpoint {endpoint})" if endpoint else ""))
+    return genai
+
+
+def get_model(name: Optional[str] = None):
+    """Shared GenerativeModel for `name`, configuring the SDK on first call"""
+    name = name or DEFAULT_MODEL
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        if name not in _models:
+            model = _configure().GenerativeModel(name)
+            _models[name] = _RestModel(model) if os.getenv("GEMINI_API_ENDPOINT") else model
+        return _models[name]
+
+
+def warm_up():
+    """Configure the SDK and build the default model ahead of the first request"""
+    try:
+        get_model()
+    except GeminiNotConfigured as e:
+        logger.error(f"{str(e)}; Gemini endpoints will fail until it is set")
+    except Exception as e:
+        logger.error(f"Error initializing Gemini: {str(e)}", exc_info=True)
+
+
+def reset():
+    with _lock:
+        global _genai, _init_seconds
+        _genai = None
+        _init_seconds = None
+        _models.clear()
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "configured": _genai is not None,
+        "models": sorted(_models),
+        "init_ms": round(_init_seconds * 1000, 1) if _init_seconds is not None else None,
+    }
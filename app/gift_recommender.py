@@ -1,8 +1,16 @@
 import os
-from typing import List, Dict
-import google.generativeai as genai
+import bisect
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 import logging
+from app.cache import TTLCache, FRESH
+from app import gemini
+from app.scoring import GiftScorer
+from app.store import get_store
+from app.metrics import GEMINI_STAGE_SECONDS
+import asyncio
+import time
+from app.singleflight import SingleFlight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -10,16 +18,79 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Configure Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    logger.error("GEMINI_API_KEY not found in environment variables")
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
+# Age and budget buckets used to canonicalize cache keys; requests that land in the
+# same buckets get the same suggestions
+AGE_BUCKETS = [(0, 12), (13, 17), (18, 24), (25, 34), (35, 44), (45, 54), (55, 64)]
+BUDGET_BANDS = [0, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000]
+DEFAULT_PLATFORMS = ['Amazon', 'Flipkart', 'Myntra']
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel('gemini-2.0-flash')
+# Suggestion modes: "gemini" asks Gemini (falling back to the local scorer when it
+# is slow or failing), "local" only uses the local scorer
+SUGGESTION_MODES = ("gemini", "local")
 
 class GiftRecommender:
+    def __init__(self, cache: Optional[TTLCache] = None, model=None, scorer: Optional[GiftScorer] = None):
+        # Gemini model; resolved lazily so importing the app doesn't configure the SDK
+        self.model = model
+        self.scorer = scorer if scorer is not None else GiftScorer()
+        self.gemini_timeout = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+        self.local_fallback = os.getenv("GIFT_LOCAL_FALLBACK", "true").lower() in ("1", "true", "yes")
+        if cache is None:
+            cache = TTLCache(
+                max_entries=int(os.getenv("GIFT_CACHE_MAX_ENTRIES", "1024")),
+                default_ttl=float(os.getenv("GIFT_CACHE_TTL", "21600")),
+                backend=get_store(),
+                namespace="gift_suggestions"
+            )
+        self.cache = cache
+        self.coalescer = SingleFlight("gift_suggestions")
+
+    @staticmethod
+    def _normalize_text(value) -> str:
+        return " ".join(str(value).lower().split()) if value else ""
+
+    @staticmethod
+    def _age_bucket(age) -> str:
+        if age is None:
+            return ""
+        for low, high in AGE_BUCKETS:
+            if low <= age <= high:
+                return f"{low}-{high}"
+        return f"{AGE_BUCKETS[-1][1] + 1}+"
+
+    @staticmethod
+    def _budget_band(amount, round_up: bool) -> Optional[float]:
+        """Snap a budget amount outwards to the nearest band edge"""
+        if amount is None:
+            return None
+        if round_up:
+            index = bisect.bisect_left(BUDGET_BANDS, amount)
+            return BUDGET_BANDS[index] if index < len(BUDGET_BANDS) else float("inf")
+        return BUDGET_BANDS[max(bisect.bisect_right(BUDGET_BANDS, amount) - 1, 0)]
+
+    @classmethod
+    def _cache_key(cls, person_details: Dict) -> Tuple:
+        """
+        Canonical cache key for a set of person details: interests are lowercased,
+        de-duplicated and sorted, age and budget are bucketed, platforms normalized.
+        """
+        interests = tuple(sorted({cls._normalize_text(interest) for interest in person_details.get('interests') or [] if interest}))
+        platforms = person_details.get('platforms') or DEFAULT_PLATFORMS
+        if not isinstance(platforms, list):
+            platforms = [platforms]
+        return (
+            cls._age_bucket(person_details.get('age')),
+            cls._normalize_text(person_details.get('gender')),
+            interests,
+            cls._normalize_text(person_details.get('occasion')),
+            cls._normalize_text(person_details.get('relationship')),
+            cls._normalize_text(person_details.get('budget')),
+            cls._budget_band(person_details.get('min_budget'), round_up=False),
+            cls._budget_band(person_details.get('max_budget'), round_up=True),
+            tuple(sorted({cls._normalize_text(platform) for platform in platforms})),
+            cls._normalize_text(person_details.get('additional_notes')),
+        )
+
     @staticmethod
     def _create_prompt(person_details: Dict) -> str:
         """Create a structured prompt for Gemini based on person details"""
@@ -71,16 +142,71 @@ Additional Notes: {person_details.get('additional_notes', 'None')}
 """
         return prompt
 
-    async def get_gift_suggestions(self, person_details: Dict) -> List[str]:
-        """Get gift suggestions from Gemini based on person details"""
+    async def get_gift_suggestions(self, person_details: Dict, use_cache: bool = True, mode: str = "gemini") -> List[str]:
+        """
+        Get gift suggestions based on person details.
+        Results are cached under a canonical key; pass use_cache=False to force a fresh call.
+        """
+        suggestions, _ = await self.get_gift_suggestions_with_source(person_details, use_cache=use_cache, mode=mode)
+        return suggestions
+
+    async def get_gift_suggestions_with_source(self, person_details: Dict, use_cache: bool = True, mode: str = "gemini") -> Tuple[List[str], str]:
+        """
+        Like get_gift_suggestions, also returning where the suggestions came from:
+        "cache", "gemini", "local" or "local_fallback".
+        """
+        if mode not in SUGGESTION_MODES:
+            raise ValueError(f"Unsupported suggestion mode: {mode}")
+        if mode == "local":
+            return self.local_suggestions(person_details), "local"
+
+        cache_key = self._cache_key(person_details)
+        if use_cache:
+            cached, state = await self.cache.aget(cache_key)
+            if state == FRESH:
+                logger.info("Serving gift suggestions from cache")
+                return list(cached), "cache"
+        
+        try:
+            # Identical concurrent requests share one Gemini call
+            suggestions = await asyncio.wait_for(
+                self.coalescer.do(cache_key, lambda: self._generate_suggestions(person_details, cache_key)),
+                timeout=self.gemini_timeout
+            )
+        except Exception as e:
+            if not self.local_fallback:
+                raise
+            reason = f"timed out after {self.gemini_timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.warning(f"Gemini gift suggestions failed ({reason}), using local scorer")
+            return self.local_suggestions(person_details), "local_fallback"
+        
+        if not suggestions and self.local_fallback:
+            logger.warning("Gemini returned no gift suggestions, using local scorer")
+            return self.local_suggestions(person_details), "local_fallback"
+        return list(suggestions), "gemini"
+
+    def local_suggestions(self, person_details: Dict) -> List[str]:
+        """Suggestions ranked by the in-process scorer; no network involved"""
+        return self.scorer.suggest(person_details, top_k=5)
+
+    def _get_model(self):
+        if self.model is None:
+            self.model = gemini.get_model()
+        return self.model
+
+    async def _generate_suggestions(self, person_details: Dict, cache_key: Tuple) -> List[str]:
         try:
             logger.info("Starting gift suggestion generation")
-            prompt = self._create_prompt(person_details)
+            with GEMINI_STAGE_SECONDS.time("gift_suggestions", "prompt_build"):
+                prompt = self._create_prompt(person_details)
             logger.info(f"Generated prompt: {prompt}")
             
-            response = await model.generate_content_async(prompt)
+            model = self._get_model()
+            with GEMINI_STAGE_SECONDS.time("gift_suggestions", "gemini_call"):
+                response = await model.generate_content_async(prompt)
             logger.info(f"Received response from Gemini: {response.text}")
             
+            parse_started = time.perf_counter()
             # Extract product suggestions from the response
             suggestions = []
             for line in response.text.split('\n'):
@@ -99,8 +225,12 @@ Additional Notes: {person_details.get('additional_notes', 'None')}
                     elif len(suggestions) < 5 and len(line) > 3 and not line.startswith('-'):
                         suggestions.append(line)
                 
+            GEMINI_STAGE_SECONDS.observe(time.perf_counter() - parse_started, "gift_suggestions", "response_parse")
             logger.info(f"Extracted suggestions: {suggestions}")
-            return suggestions[:5]
+            suggestions = suggestions[:5]
+            if suggestions:
+                self.cache.set(cache_key, list(suggestions))
+            return suggestions
             
         except Exception as e:
             logger.error(f"Error in get_gift_suggestions: {str(e)}", exc_info=True)
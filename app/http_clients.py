@@ -0,0 +1,85 @@
+from typing import Dict, Optional
+import httpx
+import os
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClientPool:
+    """
+    Long-lived, per-platform httpx clients.
+
+    Each platform gets its own AsyncClient (and therefore its own connection
+    pool), so keep-alive connections to amazon.in stay warm independently of
+    flipkart.com. Clients are opened by the app lifespan and closed on shutdown;
+    if a client is requested before `open()` it is created lazily.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections or int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+        self.timeout = timeout or float(os.getenv("HTTP_TIMEOUT", "30"))
+        if http2 is None:
+            http2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() in ("1", "true", "yes")
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=limits,
+            http2=self.http2,
+            transport=self.transport,
+        )
+
+    def open(self, platforms=("Amazon", "Flipkart", "Myntra")):
+        """Create the clients for the given platforms up front"""
+        for platform in platforms:
+            self.get(platform)
+        logger.info(f"Opened HTTP clients for {', '.join(platforms)} (http2={self.http2}, max_connections={self.max_connections})")
+
+    def get(self, platform: str) -> httpx.AsyncClient:
+        """Return the shared client for a platform, creating it if needed"""
+        client = self._clients.get(platform)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[platform] = client
+        return client
+
+    async def aclose(self):
+        """Close every client and drop its pooled connections"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+        logger.info("Closed HTTP clients")
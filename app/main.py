@@ -1,16 +1,65 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import router
+from fastapi.responses import Response
+from starlette.routing import Match
+from app.routes import router, ecommerce_searcher, gift_recommender, message_generator
+from app import gemini
+from app.store import get_store
+from app import metrics
+import asyncio
+import logging
+import time
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+async def compact_store_periodically(store, interval: float):
+    """Drop expired store entries every `interval` seconds; every worker runs this, which is harmless"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # On a thread and connection of its own, so cache lookups and writes carry on meanwhile
+            await asyncio.get_running_loop().run_in_executor(None, store.compact)
+        except Exception as e:
+            logger.error(f"Store compaction failed: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the per-platform HTTP connection pools once and reuse them for every search
+    ecommerce_searcher.clients.open()
+    ecommerce_searcher.parse_pool.start()
+    # Configure Gemini off the event loop so the app starts serving (and /health
+    # answers) right away; the first Gemini request configures it if this hasn't finished
+    if os.getenv("GEMINI_WARM_UP", "true").lower() in ("1", "true", "yes"):
+        asyncio.get_running_loop().run_in_executor(None, gemini.warm_up)
+    # Load the local gift scoring data in the background too
+    asyncio.get_running_loop().run_in_executor(None, gift_recommender.scorer.warm_up)
+    # Start warm: rebuild the product index from products persisted by earlier runs and sibling workers
+    background = [asyncio.create_task(ecommerce_searcher.load_index())]
+    store = get_store()
+    if store is not None:
+        # Generated messages are no longer persisted; drop any that earlier versions stored
+        store.executor("write").submit(store.clear, "messages")
+        background.append(asyncio.create_task(
+            compact_store_periodically(store, float(os.getenv("STORE_COMPACT_INTERVAL", "600")))
+        ))
+    yield
+    for task in background:
+        task.cancel()
+    await ecommerce_searcher.aclose()
+    if store is not None:
+        store.close()
+
 app = FastAPI(
     title="Flag Me Backend",
     description="Backend API for Flag Me gift recommendation service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS to allow all origins
@@ -24,7 +73,55 @@ app.add_middleware(
 
 app.include_router(router)
 
+def _route_template(request: Request) -> str:
+    """The matched route's path template, so /metrics labels don't grow with every URL"""
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in request.app.router.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Streaming endpoints are timed to their first byte; the body keeps flowing after this
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, _route_template(request), str(status))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Add health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    store = get_store()
+    return {
+        "status": "healthy",
+        "gemini": gemini.status(),
+        "search_cache": ecommerce_searcher.search_cache.stats(),
+        "product_index": {**ecommerce_searcher.product_index.stats(), **ecommerce_searcher.mode_counts},
+        "ranking": ecommerce_searcher.ranker.stats(),
+        "price_filters": {"min_cached": ecommerce_searcher.price_filter_min_cached, **ecommerce_searcher.price_filter_counts},
+        "deep_search": {"max_pages": ecommerce_searcher.max_pages, **ecommerce_searcher.deep_counts},
+        "parse_pool": ecommerce_searcher.parse_pool.stats(),
+        "outbound": {platform: limiter.stats() for platform, limiter in ecommerce_searcher.limiters.items()},
+        "circuit_breakers": {platform: breaker.stats() for platform, breaker in ecommerce_searcher.breakers.items()},
+        "last_good": ecommerce_searcher.last_good.stats(),
+        "gift_cache": gift_recommender.cache.stats(),
+        "gift_scorer": gift_recommender.scorer.stats(),
+        "message_cache": message_generator.cache.stats(),
+        "store": await asyncio.get_running_loop().run_in_executor(None, store.stats) if store is not None else None,
+        "coalescing": {
+            "search": ecommerce_searcher.coalescer.stats(),
+            "gift_suggestions": gift_recommender.coalescer.stats(),
+            "messages": message_generator.coalescer.stats()
+        }
+    }
@@ -1,7 +1,14 @@
-import google.generativeai as genai
+import asyncio
 import logging
 import os
+import time
+from typing import AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
+from app import gemini
+from app.cache import TTLCache, FRESH
+from app.metrics import GEMINI_STAGE_SECONDS
+from app.singleflight import SingleFlight
+from app.text_rewrite import RewriteEngine, load_rule_sets
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -10,72 +17,238 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
+# Phrase rewrites that make the generated text sound more personal
+BASE_REWRITES = {
+    "We": "I",
+    "One": "You",
+    "It is a pleasure": "I'm really happy",
+    "Best wishes": "Wishing you all the best",
+    "I hope this message finds you well": "I just wanted to say",
+}
+
+# Casual slang for young recipients in a personal relationship
+SLANG_REWRITES = {
+    "you": "u",
+    "your": "ur",
+    "because": "cuz",
+    "great": "lit",
+    "amazing": "fire",
+    "funny": "LOL",
+    "bro": "bruh",
+    "talk to you later": "TTYL",
+    "to be honest": "TBH",
+    "oh my god": "OMG",
+    "see you later": "cya",
+    "birthday": "bday"
+}
+
+SLANG_MAX_AGE = 28
+SLANG_RELATIONSHIPS = {"lover", "friend", "best friend"}
+
+EMPTY_RESPONSE_MESSAGE = "Sorry, I couldn't generate a message at this time."
 
 class MessageGenerator:
     """Class for generating personalized messages using Gemini AI"""
     
-    def __init__(self):
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+    def __init__(self, rules_path: Optional[str] = None, model=None, cache: Optional[TTLCache] = None):
+        # Gemini model; resolved lazily so importing the app doesn't configure the SDK
+        self.model = model
+        self.coalescer = SingleFlight("messages")
+        if cache is None:
+            # Opt-in (MESSAGE_CACHE_TTL=0 disables it) and in memory only: every request
+            # should get a fresh message, and recipient details stay out of the persistent store
+            cache = TTLCache(
+                max_entries=int(os.getenv("MESSAGE_CACHE_MAX_ENTRIES", "1024")),
+                default_ttl=float(os.getenv("MESSAGE_CACHE_TTL", "0")),
+                namespace="messages"
+            )
+        self.cache = cache
+        
+        # Rule sets can be overridden with a JSON file: {"base": {...}, "slang": {...}}
+        rule_sets = load_rule_sets(
+            rules_path or os.getenv("MESSAGE_REWRITE_RULES_PATH"),
+            {"base": BASE_REWRITES, "slang": SLANG_REWRITES}
+        )
+        self.base_rewriter = RewriteEngine(rule_sets["base"])
+        # Slang is applied on top of the base rewrites, folded into a single pass
+        self.slang_rewriter = self.base_rewriter.compose(RewriteEngine(rule_sets["slang"]))
+    
+    def _get_model(self):
+        if self.model is None:
+            self.model = gemini.get_model()
+        return self.model
+    
+    def get_rewriter(self, age, relationship) -> RewriteEngine:
+        # Apply slang only if recipient is young and in a personal relationship
+        if age <= SLANG_MAX_AGE and relationship.lower() in SLANG_RELATIONSHIPS:
+            return self.slang_rewriter
+        return self.base_rewriter
     
     def refine_human_like_text(self, text, age, relationship):
         """
         Post-process AI-generated text to make it more human-like.
         If the recipient is young (<=28) and in a personal relationship, add casual slang.
         """
-        text = text.replace("We", "I").replace("One", "You")
-        text = text.replace("It is a pleasure", "I'm really happy").replace("Best wishes", "Wishing you all the best")
-        text = text.replace("I hope this message finds you well", "I just wanted to say")
-        
-        # Apply slang only if recipient is young and in a personal relationship
-        if age <= 28 and relationship.lower() in ["lover", "friend", "best friend"]:
-            slang_dict = {
-                "you": "u",
-                "your": "ur",
-                "because": "cuz",
-                "great": "lit",
-                "amazing": "fire",
-                "funny": "LOL",
-                "bro": "bruh",
-                "talk to you later": "TTYL",
-                "to be honest": "TBH",
-                "oh my god": "OMG",
-                "see you later": "cya",
-                "birthday": "bday"
-            }
-            for word, slang in slang_dict.items():
-                text = text.replace(f" {word} ", f" {slang} ")
-                
-        return text
+        return self.get_rewriter(age, relationship).rewrite(text)
     
-    async def generate_personalized_message(self, name, age, occasion, gender, relationship, length):
+    async def generate_personalized_message(self, name, age, occasion, gender, relationship, length, use_cache: bool = True):
         """
         Generates a personalized message using Gemini AI with improved human-like text.
+        Identical concurrent requests share a single Gemini call. If the message
+        cache is enabled, results are also reused for MESSAGE_CACHE_TTL seconds;
+        pass use_cache=False to always get a newly generated message.
         """
         try:
-            logger.info(f"Generating message for {name} on {occasion}")
-            
-            prompt = f"""
-            Write a heartfelt, natural, and warm message for {name} on {occasion}.
-            - Keep it friendly, engaging, and natural, as if written by a close friend or family member.
-            - Make sure it does not sound robotic or overly formal.
-            - Gender: {gender}, Relationship: {relationship}, Age: {age}.
-            - Length: {length} words.
-            """
-            
-            response = await self.model.generate_content_async(prompt)
-            
-            if not response or not response.text:
-                logger.error("Empty response from Gemini AI")
-                return "Sorry, I couldn't generate a message at this time."
-                
-            refined_message = self.refine_human_like_text(response.text.strip(), age, relationship)
-            logger.info(f"Successfully generated message for {name}")
-            
-            return refined_message
-            
+            return await self._generate_message_coalesced(name, age, occasion, gender, relationship, length, use_cache=use_cache)
         except Exception as e:
             logger.error(f"Error generating message: {str(e)}", exc_info=True)
             return f"Error generating message: {str(e)}"
+    
+    async def generate_messages_batch(self, items: List[Dict], concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Generate messages for many recipients with at most `concurrency` Gemini calls in flight.
+        Results come back in input order; a failing item gets an error instead of a message
+        and doesn't affect the others.
+        """
+        concurrency = concurrency or int(os.getenv("MESSAGE_BATCH_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(concurrency)
+        logger.info(f"Generating {len(items)} messages with concurrency {concurrency}")
+        
+        async def generate(index: int, item: Dict) -> Dict:
+            async with semaphore:
+                try:
+                    message = await self._generate_message_coalesced(
+                        item['name'], item['age'], item['occasion'], item['gender'], item['relationship'], item['length'],
+                        use_cache=not item.get('bypass_cache', False)
+                    )
+                    return {'index': index, 'message': message, 'error': None}
+                except Exception as e:
+                    logger.error(f"Error generating message for batch item {index}: {str(e)}")
+                    return {'index': index, 'message': None, 'error': str(e)}
+        
+        return await asyncio.gather(*(generate(index, item) for index, item in enumerate(items)))
+    
+    async def _generate_message_coalesced(self, name, age, occasion, gender, relationship, length, use_cache: bool = True):
+        key = (name, age, occasion, gender, relationship, length)
+        caching = self.cache.default_ttl > 0
+        if use_cache and caching:
+            message, state = await self.cache.aget(key)
+            if state == FRESH:
+                logger.info(f"Message cache hit for {name} on {occasion}")
+                return message
+        message = await self.coalescer.do(
+            key,
+            lambda: self._generate_message(name, age, occasion, gender, relationship, length)
+        )
+        if caching and message != EMPTY_RESPONSE_MESSAGE:
+            self.cache.set(key, message)
+        return message
+    
+    def _build_prompt(self, name, age, occasion, gender, relationship, length):
+        return f"""
+        Write a heartfelt, natural, and warm message for {name} on {occasion}.
+        - Keep it friendly, engaging, and natural, as if written by a close friend or family member.
+        - Make sure it does not sound robotic or overly formal.
+        - Gender: {gender}, Relationship: {relationship}, Age: {age}.
+        - Length: {length} words.
+        """
+    
+    async def _generate_message(self, name, age, occasion, gender, relationship, length):
+        logger.info(f"Generating message for {name} on {occasion}")
+        
+        with GEMINI_STAGE_SECONDS.time("messages", "prompt_build"):
+            prompt = self._build_prompt(name, age, occasion, gender, relationship, length)
+        
+        model = self._get_model()
+        with GEMINI_STAGE_SECONDS.time("messages", "gemini_call"):
+            response = await model.generate_content_async(prompt)
+        
+        if not response or not response.text:
+            logger.error("Empty response from Gemini AI")
+            return EMPTY_RESPONSE_MESSAGE
+            
+        with GEMINI_STAGE_SECONDS.time("messages", "response_parse"):
+            refined_message = self.refine_human_like_text(response.text.strip(), age, relationship)
+        logger.info(f"Successfully generated message for {name}")
+        
+        return refined_message
+    
+    async def stream_personalized_message(self, name, age, occasion, gender, relationship, length) -> AsyncIterator[str]:
+        """
+        Stream a personalized message as refined text chunks while Gemini is still generating.
+        Errors are raised to the caller; nothing is cached or coalesced.
+        """
+        logger.info(f"Streaming message for {name} on {occasion}")
+        with GEMINI_STAGE_SECONDS.time("messages_stream", "prompt_build"):
+            prompt = self._build_prompt(name, age, occasion, gender, relationship, length)
+        refiner = StreamRefiner(self.get_rewriter(age, relationship))
+        
+        emitted = False
+        started = time.perf_counter()
+        refining = 0.0
+        response = await self._get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+            refine_started = time.perf_counter()
+            ready = refiner.feed(text)
+            refining += time.perf_counter() - refine_started
+            if ready:
+                emitted = True
+                yield ready
+        
+        # The call covers the whole stream, minus the time spent refining chunks
+        GEMINI_STAGE_SECONDS.observe(time.perf_counter() - started - refining, "messages_stream", "gemini_call")
+        refine_started = time.perf_counter()
+        rest = refiner.flush()
+        refining += time.perf_counter() - refine_started
+        GEMINI_STAGE_SECONDS.observe(refining, "messages_stream", "response_parse")
+        if rest:
+            emitted = True
+            yield rest
+        
+        if not emitted:
+            logger.error("Empty streamed response from Gemini AI")
+            yield EMPTY_RESPONSE_MESSAGE
+            return
+        logger.info(f"Finished streaming message for {name}")
+
+
+class StreamRefiner:
+    """
+    Apply a RewriteEngine to a stream of chunks.
+
+    Text is released as soon as every rewrite decision covering it is final,
+    which is at most the longest phrase plus one character behind the input, so
+    the concatenated output equals rewriting the whole message at once.
+    """
+
+    def __init__(self, rewriter: RewriteEngine):
+        self.rewriter = rewriter
+        self._buffer = ""
+        # Index of the first unconsumed character; anything before it is lookbehind context
+        self._start = 0
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if not self._start and not self._buffer[:1].strip():
+            # The non-streaming path strips the response before refining it
+            self._buffer = self._buffer.lstrip()
+        if not self._buffer:
+            return ""
+        ready, cut = self.rewriter.rewrite_partial(self._buffer, self._start)
+        if cut > self._start:
+            self._buffer = self._buffer[cut - 1:]
+            self._start = 1
+        return ready
+
+    def flush(self) -> str:
+        text = self._buffer.rstrip()
+        self._buffer = ""
+        if len(text) <= self._start:
+            return ""
+        ready, _ = self.rewriter.rewrite_partial(text, self._start, final=True)
+        return ready
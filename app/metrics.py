@@ -0,0 +1,184 @@
+from typing import Dict, List, Sequence, Tuple
+import bisect
+import math
+import time
+
+# Prometheus text exposition, kept in-process and dependency-free. Metrics are
+# per worker process; every observation is a dict lookup, a bisect and a few
+# additions, so they stay on in production. They are only updated from the event
+# loop thread (worker pools hand their timings back instead).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (sub-millisecond) through slow scrapes and Gemini calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _labels(self, values: Tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _check(self, labels: Tuple):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        values = self._values
+        if labels not in values:
+            self._check(labels)
+            values[labels] = 0.0
+        values[labels] += amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{self._labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        # One slot per bucket plus +Inf; cumulated when rendered
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            self._check(labels)
+            series = self._series[labels] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def time(self, *labels) -> "_Timer":
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self, labels)
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series.count if series is not None else 0
+
+    def total(self, *labels) -> float:
+        """Sum of all observations for the labels"""
+        series = self._series.get(labels)
+        return series.sum if series is not None else 0.0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {repr(series.sum)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {series.count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "flagme_http_request_duration_seconds",
+    "Time to produce the response headers, by route and status code",
+    ("method", "route", "status"),
+)
+SEARCH_STAGE_SECONDS = Histogram(
+    "flagme_search_stage_duration_seconds",
+    "Time spent in each product search stage: fetch, parse, select, extract, price_filter",
+    ("platform", "stage"),
+)
+GEMINI_STAGE_SECONDS = Histogram(
+    "flagme_gemini_stage_duration_seconds",
+    "Time spent in each Gemini pipeline stage: prompt_build, gemini_call, response_parse",
+    ("service", "stage"),
+)
+SCRAPE_RESPONSES = Counter(
+    "flagme_scrape_responses_total",
+    "Platform responses by HTTP status code (\"error\" for transport failures)",
+    ("platform", "code"),
+)
+SCRAPE_FALLBACKS = Counter(
+    "flagme_scrape_fallbacks_total",
+    "Scrapes that produced placeholder products instead of real ones",
+    ("platform",),
+)
+SELECTOR_MATCHES = Counter(
+    "flagme_selector_matches_total",
+    "Product card selector that yielded the results of a parsed page (\"none\" if nothing matched)",
+    ("platform", "selector"),
+)
@@ -1,5 +1,8 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import os
 from .gift_recommender import GiftRecommender
+from .ecommerce import EcommerceSearcher
 
 def get_recommendations(user_preferences: Dict) -> List[str]:
     """
@@ -27,17 +30,17 @@ def get_recommendations(user_preferences: Dict) -> List[str]:
     
     return recommendations[:3]  # Return top 3 search queries
 
-async def get_gift_recommendations(person_details: Dict) -> Tuple[List[str], List[str]]:
+async def get_gift_recommendations(person_details: Dict, recommender: Optional[GiftRecommender] = None, use_cache: bool = True, mode: str = "gemini") -> Tuple[List[str], List[str]]:
     """
-    Generate gift recommendations using Gemini and convert them to search queries
+    Generate gift recommendations using Gemini (or the local scorer) and convert them to search queries
     """
     # Get gift suggestions from Gemini
-    recommender = GiftRecommender()
-    gift_suggestions = await recommender.get_gift_suggestions(person_details)
+    recommender = recommender or GiftRecommender()
+    gift_suggestions = await recommender.get_gift_suggestions(person_details, use_cache=use_cache, mode=mode)
     
     # Convert gift suggestions to search queries
     search_queries = []
-    budget = person_details.get('budget', 'medium').lower()
+    budget = (person_details.get('budget') or 'medium').lower()
     
     for suggestion in gift_suggestions:
         # Add budget qualifier to search
@@ -49,3 +52,46 @@ async def get_gift_recommendations(person_details: Dict) -> Tuple[List[str], Lis
             search_queries.append(f"best {suggestion}")
     
     return gift_suggestions, search_queries
+
+async def get_gift_recommendations_with_products(
+    person_details: Dict,
+    recommender: GiftRecommender,
+    searcher: EcommerceSearcher,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    mode: str = "gemini"
+) -> List[Dict]:
+    """
+    Get gift suggestions and search products for all of them concurrently.
+    At most `concurrency` product searches run at once; a failed search leaves
+    that suggestion with no products instead of failing the whole request.
+    """
+    gift_suggestions, search_queries = await get_gift_recommendations(person_details, recommender, use_cache, mode)
+    
+    concurrency = concurrency or int(os.getenv("GIFT_SEARCH_CONCURRENCY", "3"))
+    semaphore = asyncio.Semaphore(concurrency)
+    platforms = person_details.get('platforms')
+    
+    async def search(query: str):
+        async with semaphore:
+            try:
+                return await searcher.search_all(
+                    query,
+                    min_price=person_details.get('min_budget'),
+                    max_price=person_details.get('max_budget'),
+                    platforms=set(platforms) if platforms else None
+                )
+            except Exception as e:
+                print(f"Product search failed for '{query}': {str(e)}")
+                return []
+    
+    results = await asyncio.gather(*(search(query) for query in search_queries))
+    
+    return [
+        {
+            'suggestion': suggestion,
+            'search_query': query,
+            'products': products
+        }
+        for suggestion, query, products in zip(gift_suggestions, search_queries, results)
+    ]
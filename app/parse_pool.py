@@ -0,0 +1,73 @@
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import os
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+class ParsePool:
+    """
+    Worker pool for CPU-bound HTML parsing.
+
+    `kind` is "thread" or "process". Threads are cheap to start and share memory;
+    processes sidestep the GIL so parsing scales across cores. Submitted jobs must
+    be module-level functions taking and returning plain data.
+    """
+
+    def __init__(self, kind: Optional[str] = None, max_workers: Optional[int] = None):
+        self.kind = (kind or os.getenv("PARSE_POOL_KIND", "thread")).lower()
+        if self.kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported PARSE_POOL_KIND: {self.kind}")
+        self.max_workers = max_workers or int(os.getenv("PARSE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self._executor: Optional[Executor] = None
+        # Jobs submitted but not finished yet (running + queued)
+        self.in_flight = 0
+        self.completed = 0
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parse")
+        logger.info(f"Started {self.kind} parse pool with {self.max_workers} workers")
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        logger.info("Stopped parse pool")
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) in the pool and await its result"""
+        if self._executor is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            if kwargs:
+                fn = functools.partial(fn, *args, **kwargs)
+                args = ()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "completed": self.completed,
+        }
@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from collections import OrderedDict
+import heapq
+import math
+import os
+import re
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with a light plural strip ("bottles" -> "bottle")"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class IndexHit(NamedTuple):
+    score: float
+    # Fraction of the distinct query terms found in the title
+    matched: float
+    product: object
+
+
+class _Document:
+    __slots__ = ("product", "terms", "length", "price", "platform")
+
+    def __init__(self, product, terms: Dict[str, int], length: int):
+        self.product = product
+        self.terms = terms
+        self.length = length
+        self.price = product.price
+        self.platform = product.platform
+
+
+class ProductIndex:
+    """
+    In-memory BM25 index over product titles.
+
+    Products are keyed by URL, so re-scraping a product replaces its entry with
+    the latest title and price. Price and platform are kept on each document and
+    filtered while scoring, before ranking. When full, the oldest products are
+    evicted first.
+    """
+
+    def __init__(self, max_documents: Optional[int] = None, k1: float = 1.2, b: float = 0.75):
+        self.max_documents = max_documents or int(os.getenv("PRODUCT_INDEX_MAX_DOCUMENTS", "50000"))
+        self.k1 = k1
+        self.b = b
+        # url -> document, oldest first
+        self._documents: "OrderedDict[str, _Document]" = OrderedDict()
+        # term -> {url: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, products: Iterable) -> int:
+        """Index (or re-index) products; returns how many were new"""
+        added = 0
+        for product in products:
+            if getattr(product, "is_fallback", False) or not product.url or not product.title:
+                continue
+            terms = tokenize(product.title)
+            if not terms:
+                continue
+            if product.url in self._documents:
+                self._remove(product.url)
+            else:
+                added += 1
+            frequencies: Dict[str, int] = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            self._documents[product.url] = _Document(product, frequencies, len(terms))
+            for term, count in frequencies.items():
+                self._postings.setdefault(term, {})[product.url] = count
+            self._total_length += len(terms)
+        while len(self._documents) > self.max_documents:
+            self._remove(next(iter(self._documents)))
+        return added
+
+    def _remove(self, url: str):
+        document = self._documents.pop(url)
+        self._total_length -= document.length
+        for term in document.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(url, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, min_price: Optional[float] = None, max_price: Optional[float] = None,
+               platforms: Optional[Set[str]] = None, limit: int = 10) -> List[IndexHit]:
+        """Best `limit` products for the query among those matching the filters, by BM25 score"""
+        self.searches += 1
+        terms = set(tokenize(query))
+        if not terms or not self._documents:
+            return []
+
+        total = len(self._documents)
+        average_length = self._total_length / total
+        scores: Dict[str, float] = {}
+        matched: Dict[str, int] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for url, frequency in postings.items():
+                document = self._documents[url]
+                if min_price is not None and document.price < min_price:
+                    continue
+                if max_price is not None and document.price > max_price:
+                    continue
+                if platforms is not None and document.platform not in platforms:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * document.length / average_length)
+                scores[url] = scores.get(url, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                matched[url] = matched.get(url, 0) + 1
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [IndexHit(score, matched[url] / len(terms), self._documents[url].product) for url, score in best]
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self._documents),
+            "max_documents": self.max_documents,
+            "terms": len(self._postings),
+            "searches": self.searches,
+        }
@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import base64
+import hashlib
+import heapq
+import json
+import math
+import os
+from dotenv import load_dotenv
+import logging
+from app.product_index import tokenize
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SORTS = ("relevance", "price_asc", "price_desc", "rating")
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or belongs to a different search"""
+
+
+class Ranker:
+    """
+    Merge the per-platform results of a search into one ranked, deduplicated list.
+
+    The same product listed on several platforms is detected by title token
+    overlap (Jaccard similarity of at least `dedupe_similarity`) and a price
+    within `dedupe_price_tolerance` of the other listing; only the cheapest
+    listing is kept. Exact URL repeats are always dropped.
+
+    sort="relevance" ranks by a weighted score of query relevance (the fraction
+    of query terms in the title), price (cheapest in the result set scores 1),
+    rating and review count; the other sorts order by price or rating. Pages are
+    taken with a heap rather than a full sort, and continue from an opaque
+    cursor holding the sort key of the last product served. The relevance score
+    normalizes price and review count against the first page's result set, and
+    the cursor carries those bounds to later pages, so every product's key stays
+    the same from page to page. A product that was on the previous page's result
+    set is therefore neither repeated nor skipped if results were added or
+    dropped since. Products added since that rank ahead of the cursor are not shown.
+    """
+
+    def __init__(self, relevance_weight: float = 0.6, price_weight: float = 0.2, rating_weight: float = 0.15,
+                 reviews_weight: float = 0.05, dedupe: bool = True, dedupe_similarity: float = 0.7,
+                 dedupe_price_tolerance: float = 0.1):
+        self.relevance_weight = relevance_weight
+        self.price_weight = price_weight
+        self.rating_weight = rating_weight
+        self.reviews_weight = reviews_weight
+        self.dedupe = dedupe
+        self.dedupe_similarity = dedupe_similarity
+        self.dedupe_price_tolerance = dedupe_price_tolerance
+        self.ranked = 0
+        self.duplicates_removed = 0
+
+    @classmethod
+    def from_env(cls) -> "Ranker":
+        return cls(
+            relevance_weight=float(os.getenv("RANK_WEIGHT_RELEVANCE", "0.6")),
+            price_weight=float(os.getenv("RANK_WEIGHT_PRICE", "0.2")),
+            rating_weight=float(os.getenv("RANK_WEIGHT_RATING", "0.15")),
+            reviews_weight=float(os.getenv("RANK_WEIGHT_REVIEWS", "0.05")),
+            dedupe=os.getenv("RANK_DEDUPE", "true").lower() in ("1", "true", "yes"),
+            dedupe_similarity=float(os.getenv("RANK_DEDUPE_SIMILARITY", "0.7")),
+            dedupe_price_tolerance=float(os.getenv("RANK_DEDUPE_PRICE_TOLERANCE", "0.1")),
+        )
+
+    def deduplicate(self, products: Sequence) -> List:
+        """Products without cross-platform duplicates, keeping the cheapest listing of each"""
+        kept: List = []
+        kept_terms: List[Set[str]] = []
+        # term -> indexes into kept, so each product is only compared with listings sharing a term
+        postings: Dict[str, List[int]] = {}
+        urls: Set[str] = set()
+        for product in sorted(products, key=lambda product: product.price):
+            if product.url in urls:
+                continue
+            terms = set(tokenize(product.title)) if not product.is_fallback else set()
+            if terms and self._find_duplicate(product, terms, kept, kept_terms, postings) is not None:
+                continue
+            urls.add(product.url)
+            for term in terms:
+                postings.setdefault(term, []).append(len(kept))
+            kept.append(product)
+            kept_terms.append(terms)
+        self.duplicates_removed += len(products) - len(kept)
+        return kept
+
+    def _find_duplicate(self, product, terms: Set[str], kept: List, kept_terms: List[Set[str]],
+                        postings: Dict[str, List[int]]) -> Optional[int]:
+        candidates = {index for term in terms for index in postings.get(term, ())}
+        for index in candidates:
+            other = kept[index]
+            if other.platform == product.platform:
+                continue
+            if abs(product.price - other.price) > self.dedupe_price_tolerance * max(product.price, other.price):
+                continue
+            other_terms = kept_terms[index]
+            if len(terms & other_terms) / len(terms | other_terms) >= self.dedupe_similarity:
+                return index
+        return None
+
+    @staticmethod
+    def _bounds(products: Sequence) -> Tuple[float, float, int]:
+        """(lowest price, highest price, most reviews) that the relevance score normalizes against"""
+        prices = [product.price for product in products if not product.is_fallback]
+        low, high = (min(prices), max(prices)) if prices else (0.0, 0.0)
+        return low, high, max((product.reviews or 0 for product in products), default=0)
+
+    def _key_function(self, query: str, sort: str, bounds: Tuple[float, float, int]):
+        """
+        Sort key, larger first. Placeholders (which link to the platform's search
+        page) come after real products whatever the sort, and the URL at the end
+        makes the order total so a cursor is unambiguous.
+        """
+        if sort == "price_asc":
+            return lambda product: (int(not product.is_fallback), -product.price, product.url)
+        if sort == "price_desc":
+            return lambda product: (int(not product.is_fallback), product.price, product.url)
+        if sort == "rating":
+            return lambda product: (int(not product.is_fallback), product.rating or 0.0, product.reviews or 0, product.url)
+
+        query_terms = set(tokenize(query))
+        low, high, most_reviews = bounds
+
+        def score(product) -> float:
+            relevance = len(query_terms & set(tokenize(product.title))) / len(query_terms) if query_terms else 0.0
+            price = (high - product.price) / (high - low) if high > low else 1.0
+            # Unrated products are treated as middling rather than as badly rated
+            rating = product.rating / 5.0 if product.rating else 0.5
+            reviews = math.log1p(product.reviews or 0) / math.log1p(most_reviews) if most_reviews else 0.0
+            return (self.relevance_weight * relevance + self.price_weight * price
+                    + self.rating_weight * rating + self.reviews_weight * reviews)
+
+        return lambda product: (int(not product.is_fallback), score(product), product.url)
+
+    def page(self, query: str, products: Sequence, sort: str = "relevance", limit: Optional[int] = None,
+             cursor: Optional[str] = None, context: Tuple = ()) -> Tuple[List, Optional[str]]:
+        """
+        One page of ranked products and the cursor for the next page (None on the
+        last one). `limit=None` returns everything after the cursor. `context` is
+        whatever else identifies the search (filters, platforms); a cursor is only
+        accepted for the same query, sort and context.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unsupported sort: {sort}")
+        self.ranked += 1
+        fingerprint = self._fingerprint(query, sort, context)
+        if self.dedupe:
+            products = self.deduplicate(products)
+        after, bounds = self._decode_cursor(cursor, fingerprint) if cursor else (None, None)
+        # Later pages keep scoring against the first page's bounds
+        bounds = bounds or self._bounds(products)
+        key = self._key_function(query, sort, bounds)
+
+        keyed = ((key(product), product) for product in products)
+        if after is not None:
+            keyed = (item for item in keyed if item[0] < after)
+        if limit is None:
+            ranked = sorted(keyed, key=lambda item: item[0], reverse=True)
+        else:
+            # One extra tells whether there is a next page
+            ranked = heapq.nlargest(limit + 1, keyed, key=lambda item: item[0])
+        has_more = limit is not None and len(ranked) > limit
+        ranked = ranked[:limit] if limit is not None else ranked
+        next_cursor = self._encode_cursor(ranked[-1][0], fingerprint, bounds) if has_more else None
+        return [product for _, product in ranked], next_cursor
+
+    @staticmethod
+    def _fingerprint(query: str, sort: str, context: Tuple) -> str:
+        raw = json.dumps([" ".join(tokenize(query)), sort, list(context)], default=str)
+        return hashlib.blake2s(raw.encode("utf-8"), digest_size=6).hexdigest()
+
+    @staticmethod
+    def _encode_cursor(key: Tuple, fingerprint: str, bounds: Tuple[float, float, int]) -> str:
+        raw = json.dumps({"k": list(key), "f": fingerprint, "b": list(bounds)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, fingerprint: str) -> Tuple[Tuple, Tuple[float, float, int]]:
+        """The sort key of the last product served and the relevance bounds to keep scoring against"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            key, cursor_fingerprint = tuple(data["k"]), data["f"]
+            low, high, most_reviews = data["b"]
+            bounds = (float(low), float(high), int(most_reviews))
+        except (ValueError, TypeError, KeyError) as e:
+            raise InvalidCursor(f"Malformed cursor: {e}") from None
+        if cursor_fingerprint != fingerprint:
+            raise InvalidCursor("Cursor belongs to a different search; start again without a cursor")
+        return key, bounds
+
+    def stats(self) -> Dict:
+        return {
+            "ranked": self.ranked,
+            "duplicates_removed": self.duplicates_removed,
+            "dedupe": self.dedupe,
+            "weights": {
+                "relevance": self.relevance_weight,
+                "price": self.price_weight,
+                "rating": self.rating_weight,
+                "reviews": self.reviews_weight,
+            },
+        }
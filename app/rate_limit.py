@@ -0,0 +1,208 @@
+from typing import Deque, Dict, Optional
+from collections import deque
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+class QueueTimeout(Exception):
+    """A request waited longer than the queue timeout for a slot or a token"""
+
+
+def _platform_setting(name: str, platform: str, default: str) -> str:
+    """SETTING_<PLATFORM> overrides SETTING, like the per-platform cache TTLs"""
+    return os.getenv(f"{name}_{platform.upper()}", os.getenv(name, default))
+
+
+class TokenBucket:
+    """
+    Requests per second with bursts of up to `burst`.
+
+    Tokens are reserved up front: a caller that takes the bucket below zero is
+    told how long to wait for its token, so waiters are served in arrival order
+    without polling.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token; returns the seconds to wait before using it, or None if that exceeds max_wait"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class PlatformLimiter:
+    """
+    Outbound scheduler for one platform: a token bucket caps the request rate and
+    an AIMD limit caps how many requests are in flight.
+
+    While it is saturated, the concurrency limit grows by about one per limit's
+    worth of successful, normal-latency responses. It halves on a non-200
+    response, a transport error or a latency spike (a response slower than both
+    `latency_factor` times the smoothed latency and `latency_floor` seconds).
+    Only responses to requests sent after the last decrease can cut it again, so
+    one burst of failures halves it once rather than collapsing it to the
+    minimum. Requests over the rate or the limit wait in FIFO order for
+    up to `queue_timeout` seconds and then fail with QueueTimeout.
+    """
+
+    def __init__(self, name: str, rate: float = 2.0, burst: float = 5.0, initial_limit: float = 4.0,
+                 min_limit: float = 1.0, max_limit: float = 16.0, queue_timeout: float = 5.0,
+                 latency_factor: float = 2.5, latency_floor: float = 1.0, backoff: float = 0.5):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = max(min_limit, min(initial_limit, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.latency_factor = latency_factor
+        # Responses faster than this are never treated as spikes, whatever the average
+        self.latency_floor = latency_floor
+        self.backoff = backoff
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.requests = 0
+        self.queued = 0
+        self.queue_timeouts = 0
+        self.decreases = 0
+
+    @classmethod
+    def from_env(cls, platform: str) -> "PlatformLimiter":
+        return cls(
+            platform,
+            rate=float(_platform_setting("SCRAPE_RATE_PER_SECOND", platform, "2")),
+            burst=float(_platform_setting("SCRAPE_BURST", platform, "5")),
+            initial_limit=float(_platform_setting("SCRAPE_INITIAL_CONCURRENCY", platform, "4")),
+            min_limit=float(_platform_setting("SCRAPE_MIN_CONCURRENCY", platform, "1")),
+            max_limit=float(_platform_setting("SCRAPE_MAX_CONCURRENCY", platform, "16")),
+            queue_timeout=float(_platform_setting("SCRAPE_QUEUE_TIMEOUT_SECONDS", platform, "5")),
+            latency_factor=float(_platform_setting("SCRAPE_LATENCY_SPIKE_FACTOR", platform, "2.5")),
+            latency_floor=float(_platform_setting("SCRAPE_LATENCY_SPIKE_MIN_SECONDS", platform, "1")),
+        )
+
+    def _has_capacity(self) -> bool:
+        return self.inflight < int(self.limit)
+
+    def _wake_waiters(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is handed over directly so later arrivals can't take it first
+                self.inflight += 1
+                waiter.set_result(None)
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a rate token and then a concurrency slot; returns the send time
+        to pass to `release`. Raises QueueTimeout if both aren't available in time.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self.requests += 1
+
+        # Rate first, so requests waiting for their turn don't count as in flight
+        wait = self.bucket.reserve(timeout)
+        if wait is None:
+            self.queue_timeouts += 1
+            raise QueueTimeout(f"rate limit would delay the request past {timeout:.1f}s")
+        if wait:
+            await asyncio.sleep(wait)
+
+        if self._has_capacity() and not self._waiters:
+            self.inflight += 1
+            return time.monotonic()
+
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(0.0, deadline - time.monotonic()))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just as we gave up; pass it on
+                self.inflight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.queue_timeouts += 1
+            raise QueueTimeout(f"no request slot within {timeout:.1f}s") from None
+        return time.monotonic()
+
+    def release(self, sent_at: Optional[float], ok: Optional[bool], latency: Optional[float] = None):
+        """
+        Give the slot back and adapt the limit. `ok` is None when the request
+        never reached the platform (cancelled), which leaves the limit alone.
+        """
+        # Only grow the limit when it is what's holding requests back, otherwise
+        # a quiet period would let it drift far above what the platform tolerates
+        saturated = self.inflight * 2 >= self.limit
+        self.inflight -= 1
+        if ok is True and latency is not None:
+            spike = (self.latency_ewma is not None
+                     and latency > max(self.latency_ewma * self.latency_factor, self.latency_floor))
+            self.latency_ewma = latency if self.latency_ewma is None else 0.9 * self.latency_ewma + 0.1 * latency
+            if spike:
+                self._decrease(sent_at, "latency spike")
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        elif ok is False:
+            self._decrease(sent_at, "failed request")
+        self._wake_waiters()
+
+    def _decrease(self, sent_at: Optional[float], reason: str):
+        if sent_at is not None and sent_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+        logger.warning(f"{self.name} concurrency limit cut to {self.limit:.1f} after {reason}")
+
+    def stats(self) -> Dict:
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "tokens": round(self.bucket.tokens, 2),
+            "rate_per_second": self.bucket.rate,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "requests": self.requests,
+            "queued": self.queued,
+            "queue_timeouts": self.queue_timeouts,
+            "decreases": self.decreases,
+        }
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.gift_recommender import GiftRecommender
 from app.message_generator import MessageGenerator
 from app.schemas import (
@@ -6,10 +7,18 @@ from app.schemas import (
     ProductSearchResponse,
     GiftRecommendationRequest,
     GiftRecommendationResponse,
+    GiftRecommendationsWithProductsResponse,
     MessageGenerationRequest,
-    MessageGenerationResponse
+    MessageGenerationResponse,
+    MessageBatchRequest,
+    MessageBatchResponse
 )
 from app.ecommerce import EcommerceSearcher
+from app.ranking import InvalidCursor
+from app.models import get_gift_recommendations_with_products
+from app.responses import FastJSONResponse, dumps
+import json
+import time
 import logging
 
 # Set up logging
@@ -21,6 +30,18 @@ ecommerce_searcher = EcommerceSearcher()
 gift_recommender = GiftRecommender()
 message_generator = MessageGenerator()
 
+MAX_MESSAGE_BATCH = 500
+
+def _product_to_dict(product) -> dict:
+    # Already the ProductResult shape; the routes return it without revalidating
+    return {
+        'title': product.title,
+        'price': float(product.price),
+        'url': product.url,
+        'platform': product.platform,
+        'image_url': product.image_url
+    }
+
 @router.post('/gift-suggestions', response_model=GiftRecommendationResponse)
 async def get_gift_suggestions(request: GiftRecommendationRequest):
     """
@@ -29,23 +50,69 @@ async def get_gift_suggestions(request: GiftRecommendationRequest):
     try:
         logger.info(f"Received gift suggestion request: {request.person_details}")
         
-        # Get gift suggestions from Gemini
-        suggestions = await gift_recommender.get_gift_suggestions(request.person_details.dict())
+        # Get gift suggestions from Gemini or the local scorer
+        suggestions, source = await gift_recommender.get_gift_suggestions_with_source(
+            request.person_details.dict(),
+            use_cache=not request.bypass_cache,
+            mode=request.mode
+        )
         
         if not suggestions:
             logger.warning("No gift suggestions received from Gemini")
             raise HTTPException(status_code=500, detail="Failed to generate gift suggestions")
             
-        logger.info(f"Generated gift suggestions: {suggestions}")
+        logger.info(f"Generated gift suggestions ({source}): {suggestions}")
         
         return {
             'gift_suggestions': suggestions,
+            'source': source
         }
         
     except Exception as e:
         logger.error(f"Error in get_gift_suggestions: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/gift-recommendations', response_model=GiftRecommendationsWithProductsResponse)
+async def get_gift_recommendations_with_products_route(request: GiftRecommendationRequest):
+    """
+    Get gift suggestions from Gemini together with matching products for each one,
+    searching all suggestions concurrently in a single round trip
+    """
+    try:
+        logger.info(f"Received gift recommendation request: {request.person_details}")
+        
+        groups = await get_gift_recommendations_with_products(
+            request.person_details.dict(),
+            recommender=gift_recommender,
+            searcher=ecommerce_searcher,
+            use_cache=not request.bypass_cache,
+            mode=request.mode
+        )
+        
+        if not groups:
+            logger.warning("No gift suggestions received from Gemini")
+            raise HTTPException(status_code=500, detail="Failed to generate gift suggestions")
+        
+        logger.info(f"Found products for {len(groups)} gift suggestions")
+        
+        return FastJSONResponse({
+            'gift_suggestions': [group['suggestion'] for group in groups],
+            'recommendations': [
+                {
+                    'recommendations': [group['suggestion']],
+                    'search_query': group['search_query'],
+                    'products': [_product_to_dict(product) for product in group['products']]
+                }
+                for group in groups
+            ]
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_gift_recommendations_with_products: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post('/search-products', response_model=ProductSearchResponse)
 async def search_products(request: ProductSearchRequest):
     try:
@@ -63,35 +130,33 @@ async def search_products(request: ProductSearchRequest):
         
         print(f"Starting search for query: '{request.query}' with platforms: {set(request.platforms) if request.platforms else None}")
         
-        # Create searcher instance
-        searcher = EcommerceSearcher()
-        
-        # Search across platforms
-        products = await searcher.search_all(
+        # Search across platforms using the shared searcher (pooled connections), then rank and page
+        products, platform_status, next_cursor = await ecommerce_searcher.search_page(
             request.query,
             min_price=request.min_price,
             max_price=request.max_price,
-            platforms=set(request.platforms) if request.platforms else None
+            platforms=set(request.platforms) if request.platforms else None,
+            deadline=request.deadline_seconds,
+            mode=request.mode,
+            sort=request.sort,
+            limit=request.limit,
+            cursor=request.cursor,
+            max_results=request.max_results
         )
         
         logger.info(f"Found {len(products)} products for query: {request.query}")
         print(f"Search completed. Found {len(products)} products.")
         
-        # Convert to a list of dictionaries for JSON response
-        product_list = [
-            {
-                'title': product.title,
-                'price': product.price,
-                'url': product.url,
-                'platform': product.platform,
-                'image_url': product.image_url
-            }
-            for product in products
-        ]
+        # Convert to a list of dictionaries and encode them once, skipping response_model validation
+        product_list = [_product_to_dict(product) for product in products]
         
-        return {
-            'products': product_list
-        }
+        return FastJSONResponse({
+            'products': product_list,
+            'platform_status': platform_status,
+            'next_cursor': next_cursor
+        })
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching products: {str(e)}")
         print(f"Error in search_products: {str(e)}")
@@ -99,6 +164,50 @@ async def search_products(request: ProductSearchRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error searching products: {str(e)}")
 
+@router.post('/search-products/stream')
+async def search_products_stream(request: ProductSearchRequest):
+    """
+    Stream product search results as newline-delimited JSON.
+
+    Emits one `products` event per platform as soon as that platform finishes,
+    followed by a final `summary` event.
+    """
+    logger.info(f"Received streaming product search request: {request.query}")
+    started = time.perf_counter()
+    
+    async def events():
+        statuses = {}
+        try:
+            async for platform, products, status in ecommerce_searcher.search_iter(
+                request.query,
+                min_price=request.min_price,
+                max_price=request.max_price,
+                platforms=set(request.platforms) if request.platforms else None,
+                deadline=request.deadline_seconds,
+                mode=request.mode,
+                max_results=request.max_results
+            ):
+                statuses[platform] = status
+                yield dumps({
+                    'event': 'products',
+                    'platform': platform,
+                    'status': status,
+                    'products': [_product_to_dict(product) for product in products],
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+                }) + b"\n"
+        except Exception as e:
+            logger.error(f"Error in streaming product search: {str(e)}", exc_info=True)
+            yield dumps({'event': 'error', 'detail': f"Error searching products: {str(e)}"}) + b"\n"
+        
+        yield dumps({
+            'event': 'summary',
+            'total': sum(status['count'] for status in statuses.values()),
+            'platform_status': statuses,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }) + b"\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.post('/generate-message', response_model=MessageGenerationResponse)
 async def generate_message(request: MessageGenerationRequest):
     """
@@ -114,7 +223,8 @@ async def generate_message(request: MessageGenerationRequest):
             occasion=request.occasion,
             gender=request.gender,
             relationship=request.relationship,
-            length=request.length
+            length=request.length,
+            use_cache=not request.bypass_cache
         )
         
         if not message:
@@ -130,3 +240,76 @@ async def generate_message(request: MessageGenerationRequest):
     except Exception as e:
         logger.error(f"Error in generate_message: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post('/generate-message/stream')
+async def generate_message_stream(request: MessageGenerationRequest):
+    """
+    Stream a personalized message as Server-Sent Events.
+
+    Emits `chunk` events with refined text as Gemini generates it, then a final
+    `done` event with the full message (or an `error` event).
+    """
+    logger.info(f"Received streaming message request for {request.name} on {request.occasion}")
+    started = time.perf_counter()
+    
+    async def events():
+        parts = []
+        first_chunk_ms = None
+        try:
+            async for text in message_generator.stream_personalized_message(
+                name=request.name,
+                age=request.age,
+                occasion=request.occasion,
+                gender=request.gender,
+                relationship=request.relationship,
+                length=request.length
+            ):
+                if first_chunk_ms is None:
+                    first_chunk_ms = round((time.perf_counter() - started) * 1000, 1)
+                    logger.info(f"First message chunk for {request.name} after {first_chunk_ms}ms")
+                parts.append(text)
+                yield _sse('chunk', {'text': text})
+        except Exception as e:
+            logger.error(f"Error in streaming message generation: {str(e)}", exc_info=True)
+            yield _sse('error', {'detail': f"Error generating message: {str(e)}"})
+            return
+        
+        yield _sse('done', {
+            'message': "".join(parts),
+            'first_chunk_ms': first_chunk_ms,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@router.post('/generate-messages', response_model=MessageBatchResponse)
+async def generate_messages(request: MessageBatchRequest):
+    """
+    Generate personalized messages for many recipients in one call.
+    Gemini calls run with bounded concurrency; results are returned in request order
+    and a failed item carries an error instead of failing the whole batch.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(request.items) > MAX_MESSAGE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MESSAGE_BATCH} items per batch")
+    
+    logger.info(f"Received batch message generation request for {len(request.items)} recipients")
+    start = time.monotonic()
+    results = await message_generator.generate_messages_batch(
+        [item.dict() for item in request.items],
+        concurrency=request.concurrency
+    )
+    failed = sum(1 for result in results if result['error'])
+    logger.info(f"Generated {len(results) - failed}/{len(results)} messages in {time.monotonic() - start:.2f}s")
+    
+    return {
+        'results': results
+    }
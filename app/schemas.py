@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Set
+from typing import Dict, List, Literal, Optional, Set
 
 class RecommendationRequest(BaseModel):
     user_preferences: dict
@@ -14,15 +14,40 @@ class ProductResult(BaseModel):
 class RecommendationResponse(BaseModel):
     recommendations: List[str]
     products: Optional[List[ProductResult]] = None
+    search_query: Optional[str] = None
 
 class ProductSearchRequest(BaseModel):
     query: str
     min_price: Optional[float] = None
     max_price: Optional[float] = None
     platforms: Optional[Set[str]] = None
+    # Total latency budget in seconds; defaults to SEARCH_DEADLINE_SECONDS
+    deadline_seconds: Optional[float] = Field(None, gt=0, le=60)
+    # "live" scrapes, "index" answers from the local product index, "auto" uses the
+    # index and scrapes platforms whose index coverage for the query is thin
+    mode: Literal["live", "index", "auto"] = "live"
+    # Results from all platforms are deduplicated and ranked; "relevance" weighs query
+    # match, price, rating and reviews
+    sort: Literal["relevance", "price_asc", "price_desc", "rating"] = "relevance"
+    # Page size; omit to get every result. Pass the previous response's next_cursor for the next page
+    limit: Optional[int] = Field(None, ge=1, le=100)
+    cursor: Optional[str] = None
+    # Products to collect per platform, default about one results page (10). Larger
+    # targets read further results pages; send the same value with every cursor
+    max_results: Optional[int] = Field(None, ge=1, le=200)
+
+class PlatformStatus(BaseModel):
+    status: str  # ok, timeout or error
+    count: int = 0
+    elapsed_ms: Optional[float] = None
+    detail: Optional[str] = None
+    source: Optional[str] = None  # live, index or last_good
 
 class ProductSearchResponse(BaseModel):
     products: List[ProductResult]
+    platform_status: Dict[str, PlatformStatus] = {}
+    # Cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
 
 class GiftPersonDetails(BaseModel):
     age: Optional[int] = None
@@ -38,9 +63,20 @@ class GiftPersonDetails(BaseModel):
 
 class GiftRecommendationRequest(BaseModel):
     person_details: GiftPersonDetails
+    # Skip the suggestion cache and always ask Gemini
+    bypass_cache: bool = False
+    # "gemini" (falls back to the local scorer if Gemini is slow or down) or "local"
+    mode: Literal["gemini", "local"] = "gemini"
 
 class GiftRecommendationResponse(BaseModel):
     gift_suggestions: List[str]
+    # cache, gemini, local or local_fallback
+    source: Optional[str] = None
+
+class GiftRecommendationsWithProductsResponse(BaseModel):
+    gift_suggestions: List[str]
+    # One entry per suggestion, with the products found for it
+    recommendations: List[RecommendationResponse]
 
 class MessageGenerationRequest(BaseModel):
     name: str
@@ -49,6 +85,21 @@ class MessageGenerationRequest(BaseModel):
     gender: str
     relationship: str
     length: int = Field(..., ge=10, le=500)
+    # Skip the message cache (when MESSAGE_CACHE_TTL enables it) and always generate a new message
+    bypass_cache: bool = False
 
 class MessageGenerationResponse(BaseModel):
     message: str
+
+class MessageBatchRequest(BaseModel):
+    items: List[MessageGenerationRequest]
+    # Maximum Gemini calls in flight; defaults to MESSAGE_BATCH_CONCURRENCY
+    concurrency: Optional[int] = Field(None, ge=1, le=50)
+
+class MessageBatchResult(BaseModel):
+    index: int
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class MessageBatchResponse(BaseModel):
+    results: List[MessageBatchResult]
@@ -0,0 +1,242 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import csv
+import os
+import re
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "processed", "processed_content.csv")
+
+# Numeric columns of processed_content.csv (all min-max normalized to [0, 1], each over its own range)
+FEATURE_COLUMNS = {
+    "recommend_probability": "Probability for the product to be recommended to the person",
+    "rating": "Rating of the product",
+    "sentiment": "Customer review sentiment score (overall)",
+    "similar_rating": "Average rating given to similar products",
+    "clicks": "Number of clicks on similar products",
+    "purchases": "Number of similar products purchased so far",
+    "price": "Price of the product",
+    "median_price": "Median purchasing price (in rupees)",
+}
+CATEGORY_COLUMNS = {
+    "gender": "Gender",
+    "brand": "Brand of the product",
+    "holiday": "Holiday",
+    "season": "Season",
+    "geography": "Geographical locations",
+}
+
+# Rupee ranges the preprocessing notebook normalized "Price of the product" and
+# "Median purchasing price (in rupees)" from
+PRICE_MIN = 90.0
+PRICE_MAX = 10000.0
+MEDIAN_PRICE_MIN = 100.0
+MEDIAN_PRICE_MAX = 19000.0
+
+# Weights for the quality part of the score (they sum to 1)
+DEFAULT_WEIGHTS = {
+    "recommend_probability": 0.35,
+    "rating": 0.2,
+    "sentiment": 0.15,
+    "similar_rating": 0.1,
+    "clicks": 0.1,
+    "purchases": 0.1,
+}
+# Bonuses added when a row matches the recipient profile
+DEFAULT_BONUSES = {
+    "gender": 0.25,
+    "holiday": 0.1,
+    "season": 0.1,
+    "brand_mentioned": 0.5,
+    "price_fit": 0.15,
+}
+
+HOLIDAY_OCCASIONS = {"diwali", "christmas", "holi", "eid", "rakhi", "raksha bandhan", "new year", "pongal", "onam", "navratri", "dussehra", "lohri"}
+# Indian seasons as used by the dataset, by month
+MONTH_SEASONS = {12: "winter", 1: "winter", 2: "winter", 3: "spring", 4: "summer", 5: "summer", 6: "summer",
+                 7: "monsoon", 8: "monsoon", 9: "monsoon", 10: "winter", 11: "winter"}
+# Leading words of brand names that are too common to identify the brand on their own
+GENERIC_BRAND_WORDS = {"the", "head", "max", "forest", "flying", "sugar", "wild", "urban", "allen"}
+GENDER_ALIASES = {"male": "male", "man": "male", "boy": "male", "m": "male",
+                  "female": "female", "woman": "female", "girl": "female", "f": "female"}
+
+
+class GiftScorer:
+    """
+    In-process gift ranking over processed_content.csv.
+
+    The CSV is loaded once into a float32 feature matrix plus small integer code
+    arrays for the categorical columns. Scoring a profile is a handful of
+    vectorized operations over all rows followed by a per-brand max, so a
+    request takes well under a millisecond and needs no network.
+    """
+
+    def __init__(self, path: Optional[str] = None, weights: Optional[Dict[str, float]] = None,
+                 bonuses: Optional[Dict[str, float]] = None):
+        self.path = path or os.getenv("GIFT_SCORING_DATA_PATH", DEFAULT_DATA_PATH)
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.bonuses = dict(bonuses or DEFAULT_BONUSES)
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.rows = 0
+        self.load_ms: Optional[float] = None
+
+    def load(self):
+        """Read the CSV into arrays; later calls are no-ops"""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            start = time.perf_counter()
+            with open(self.path, newline="", encoding="utf-8") as f:
+                records = list(csv.DictReader(f))
+
+            self.features = np.array(
+                [[float(record[column]) for column in FEATURE_COLUMNS.values()] for record in records],
+                dtype=np.float32
+            ).reshape(len(records), len(FEATURE_COLUMNS))
+            self.feature_index = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+            self.vocab: Dict[str, List[str]] = {}
+            self.codes: Dict[str, np.ndarray] = {}
+            for name, column in CATEGORY_COLUMNS.items():
+                values = [record[column].strip() for record in records]
+                vocab = sorted(set(values))
+                lookup = {value: i for i, value in enumerate(vocab)}
+                self.vocab[name] = vocab
+                self.codes[name] = np.array([lookup[value] for value in values], dtype=np.int16)
+            # Full name and distinctive leading word of each brand, used to spot brands mentioned in free text
+            self.brand_keys = []
+            for brand in self.vocab["brand"]:
+                words = re.findall(r"[a-z0-9&]+", brand.lower())
+                keys = {" ".join(words)}
+                if words and len(words[0]) > 2 and words[0] not in GENERIC_BRAND_WORDS:
+                    keys.add(words[0])
+                self.brand_keys.append(keys)
+            self.price_rupees = PRICE_MIN + self.features[:, self.feature_index["price"]] * (PRICE_MAX - PRICE_MIN)
+            self.median_price_rupees = MEDIAN_PRICE_MIN + self.features[:, self.feature_index["median_price"]] * (MEDIAN_PRICE_MAX - MEDIAN_PRICE_MIN)
+            self.quality_weights = np.array(
+                [self.weights.get(name, 0.0) for name in FEATURE_COLUMNS], dtype=np.float32
+            )
+
+            self.rows = len(records)
+            self.load_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.loaded = True
+            logger.info(f"Loaded {self.rows} scoring rows ({len(self.vocab['brand'])} brands) in {self.load_ms}ms")
+
+    def warm_up(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Error loading gift scoring data from {self.path}: {str(e)}")
+
+    def _column(self, name: str) -> np.ndarray:
+        return self.features[:, self.feature_index[name]]
+
+    def _match(self, category: str, value: Optional[str]) -> Optional[np.ndarray]:
+        """Boolean mask of rows whose category equals value, or None if the value is unknown"""
+        if value is None or value not in self.vocab[category]:
+            return None
+        return self.codes[category] == self.vocab[category].index(value)
+
+    @staticmethod
+    def _budget_range(person_details: Dict) -> Tuple[Optional[float], Optional[float]]:
+        low, high = person_details.get('min_budget'), person_details.get('max_budget')
+        if low is None and high is None and person_details.get('budget'):
+            amounts = [float(amount.replace(",", "")) for amount in re.findall(r"\d[\d,]*(?:\.\d+)?", str(person_details['budget']))]
+            if len(amounts) >= 2:
+                low, high = min(amounts[:2]), max(amounts[:2])
+            elif amounts:
+                high = amounts[0]
+        return low, high
+
+    def score(self, person_details: Dict, now: Optional[datetime] = None) -> np.ndarray:
+        """Score every row for a profile; rows outside the budget score -inf"""
+        self.load()
+        scores = self.features @ self.quality_weights
+
+        gender = GENDER_ALIASES.get(str(person_details.get('gender') or "").strip().lower())
+        gender_match = self._match("gender", gender)
+        if gender_match is not None:
+            scores = scores + self.bonuses["gender"] * gender_match
+
+        occasion = str(person_details.get('occasion') or "").strip().lower()
+        if occasion:
+            holiday_match = self._match("holiday", "Yes" if occasion in HOLIDAY_OCCASIONS else "No")
+            if holiday_match is not None:
+                scores = scores + self.bonuses["holiday"] * holiday_match
+
+        season_match = self._match("season", MONTH_SEASONS[(now or datetime.now()).month])
+        if season_match is not None:
+            scores = scores + self.bonuses["season"] * season_match
+
+        # Brands named in the interests or notes are a strong signal; "lakme" matches "Lakme Ayurveda"
+        mentioned = " ".join(person_details.get('interests') or []) + " " + str(person_details.get('additional_notes') or "")
+        mentioned = f" {' '.join(re.findall(r'[a-z0-9&]+', mentioned.lower()))} "
+        brand_codes = [i for i, keys in enumerate(self.brand_keys) if any(f" {key} " in mentioned for key in keys)]
+        if brand_codes:
+            scores = scores + self.bonuses["brand_mentioned"] * np.isin(self.codes["brand"], brand_codes)
+
+        low, high = self._budget_range(person_details)
+        if low is not None or high is not None:
+            low = low if low is not None else 0.0
+            high = high if high is not None else np.inf
+            in_budget = (self.price_rupees >= low) & (self.price_rupees <= high)
+            scores = np.where(in_budget, scores, -np.inf)
+        else:
+            # Without a budget, prefer products priced like what the person usually buys.
+            # The two columns were normalized over different ranges, so compare rupees,
+            # scaled by the product price range
+            price_fit = 1.0 - np.minimum(1.0, np.abs(self.price_rupees - self.median_price_rupees) / (PRICE_MAX - PRICE_MIN))
+            scores = scores + self.bonuses["price_fit"] * price_fit
+        return scores
+
+    def rank_brands(self, person_details: Dict, top_k: int = 5, now: Optional[datetime] = None) -> List[Dict]:
+        """Top brands for a profile, each scored by its best matching product"""
+        scores = self.score(person_details, now=now)
+        brand_codes = self.codes["brand"]
+        best = np.full(len(self.vocab["brand"]), -np.inf, dtype=np.float64)
+        np.maximum.at(best, brand_codes, scores)
+
+        candidates = np.flatnonzero(np.isfinite(best))
+        if candidates.size == 0:
+            return []
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-best[candidates], k - 1)[:k]]
+        top = top[np.argsort(-best[top], kind="stable")]
+
+        results = []
+        for code in top:
+            rows = np.flatnonzero((brand_codes == code) & np.isfinite(scores))
+            row = rows[np.argmax(scores[rows])]
+            results.append({
+                "brand": self.vocab["brand"][code],
+                "score": round(float(best[code]), 4),
+                "price": round(float(self.price_rupees[row]), 2),
+                "rating": round(float(self._column("rating")[row]) * 5, 1),
+            })
+        return results
+
+    def suggest(self, person_details: Dict, top_k: int = 5, now: Optional[datetime] = None) -> List[str]:
+        """Gift suggestions as searchable strings, in the same shape Gemini returns"""
+        gender = GENDER_ALIASES.get(str(person_details.get('gender') or "").strip().lower())
+        recipient = {"male": " for him", "female": " for her"}.get(gender, "")
+        return [f"{brand['brand']} gift{recipient}" for brand in self.rank_brands(person_details, top_k=top_k, now=now)]
+
+    def stats(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "rows": self.rows,
+            "brands": len(self.vocab["brand"]) if self.loaded else 0,
+            "load_ms": self.load_ms,
+        }
@@ -0,0 +1,186 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+import logging
+from app.cache import CacheBackend
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "store.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (stale_until);
+"""
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache backend in a single SQLite file in WAL mode.
+
+    WAL lets every worker process on the node read while one of them writes, so
+    uvicorn workers share what each of them scrapes or generates, and a restarted
+    process starts with everything that hasn't expired. Every thread of every
+    process opens its own connection on first use, so a compaction or a write
+    waiting up to `busy_timeout` seconds for SQLite's write lock never holds up
+    lookups on the reader thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200000, busy_timeout: float = 5.0):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # Every connection this process opened, so close() can reach other threads' ones
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_pid: Optional[int] = None
+        self._connections_lock = threading.Lock()
+        self.compactions = 0
+        self.compacted = 0
+        self.last_compaction_ms: Optional[float] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so workers forked from a parent that
+        # already opened the store reconnect
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Durable across process crashes; an OS crash can lose the last few writes, which is fine for a cache
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        with self._connections_lock:
+            if self._connections_pid != os.getpid():
+                self._connections = []
+                self._connections_pid = os.getpid()
+            self._connections.append(connection)
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[str, float, float]]:
+        row = self._connect().execute(
+            "SELECT value, fresh_until, stale_until FROM entries WHERE namespace = ? AND key = ? AND stale_until > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, namespace: str, key: str, value: str, fresh_until: float, stale_until: float):
+        self.set_many(namespace, [(key, value)], fresh_until, stale_until)
+
+    def set_many(self, namespace: str, items: Iterable[Tuple[str, str]], fresh_until: float, stale_until: float):
+        now = time.time()
+        rows = [(namespace, key, value, fresh_until, stale_until, now) for key, value in items]
+        if not rows:
+            return
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace: str, key: str):
+        self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str):
+        self._connect().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def items(self, namespace: str) -> Iterator[Tuple[str, str]]:
+        """Unexpired entries of a namespace, oldest write first"""
+        rows = self._connect().execute(
+            "SELECT key, value FROM entries WHERE namespace = ? AND stale_until > ? ORDER BY updated",
+            (namespace, time.time())
+        ).fetchall()
+        return iter(rows)
+
+    def compact(self) -> int:
+        """
+        Delete expired entries, trim the oldest writes beyond `max_entries`, and
+        checkpoint the WAL back into the main file so it doesn't grow unbounded.
+        Safe to run from any worker at any time; run it on a thread of its own
+        (not the reader or writer thread) so lookups and writes carry on meanwhile.
+        """
+        start = time.perf_counter()
+        connection = self._connect()
+        removed = connection.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),)).rowcount
+        excess = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += connection.execute(
+                "DELETE FROM entries WHERE (namespace, key) IN "
+                "(SELECT namespace, key FROM entries ORDER BY updated LIMIT ?)",
+                (excess,)
+            ).rowcount
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.compactions += 1
+        self.compacted += removed
+        self.last_compaction_ms = round((time.perf_counter() - start) * 1000, 1)
+        if removed:
+            logger.info(f"Compacted store: removed {removed} entries in {self.last_compaction_ms}ms")
+        return removed
+
+    def stats(self) -> Dict:
+        rows = self._connect().execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall()
+        return {
+            "path": self.path,
+            "entries": dict(rows),
+            "max_entries": self.max_entries,
+            "compactions": self.compactions,
+            "compacted": self.compacted,
+            "last_compaction_ms": self.last_compaction_ms,
+        }
+
+    def close(self):
+        """Apply queued writes, then close every connection this process opened"""
+        self.shutdown()
+        with self._connections_lock:
+            connections = self._connections if self._connections_pid == os.getpid() else []
+            self._connections = []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+_store: Optional[CacheBackend] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[CacheBackend]:
+    """
+    The node-wide store configured by STORE_PATH, shared by every cache in the
+    process. Set STORE_PATH to an empty string to keep caches in memory only.
+    """
+    global _store
+    path = os.getenv("STORE_PATH", DEFAULT_STORE_PATH)
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteBackend(
+                path,
+                max_entries=int(os.getenv("STORE_MAX_ENTRIES", "200000")),
+                busy_timeout=float(os.getenv("STORE_BUSY_TIMEOUT_SECONDS", "5"))
+            )
+        return _store
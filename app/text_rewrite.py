@@ -0,0 +1,131 @@
+from typing import Dict, Mapping, Optional, Tuple
+import json
+import logging
+import re
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most distinct first characters for which the pattern is laid out for prefix scanning
+PREFIX_SCAN_MAX_CHARS = 16
+
+
+def _trie_pattern(keys) -> str:
+    """
+    Whole-word regex for `keys` factored into a character trie, so a failed match
+    costs one branch per character instead of one attempt per phrase. Optional
+    tails are greedy, so the longest phrase that matches wins.
+
+    When phrases start with only a few distinct characters, the start-of-word
+    check sits after each phrase's first character rather than in front of the
+    pattern, which lets the regex engine skip ahead to positions holding a
+    possible first character instead of testing every position. With many
+    distinct first characters that scan doesn't pay off and a single leading
+    check is cheaper.
+    """
+    trie: Dict[str, dict] = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:%s)%s" % ("|".join(branches), "?" if "" in node else "")
+
+    if len(trie) > PREFIX_SCAN_MAX_CHARS:
+        return r"(?<!\w)(%s)(?!\w)" % build(trie)
+    first = [re.escape(char) + r"(?<!\w.)" + build(child) for char, child in sorted(trie.items())]
+    return r"(%s)(?!\w)" % "|".join(first)
+
+
+class RewriteEngine:
+    """
+    Single-pass phrase rewriter.
+
+    All rules are compiled once into one pattern that only matches whole words:
+    a phrase may not be preceded or followed by a word character, so rules apply
+    next to punctuation and at the ends of the text but never inside longer words.
+    Where phrases overlap the longest one wins. Matching is case-sensitive.
+    """
+
+    def __init__(self, rules: Mapping[str, str]):
+        self.rules: Dict[str, str] = {key.strip(): value for key, value in rules.items() if key.strip()}
+        self.max_key_length = max(map(len, self.rules), default=0)
+        self._pattern = None
+        if self.rules:
+            self._pattern = re.compile(_trie_pattern(self.rules))
+
+    def rewrite(self, text: str) -> str:
+        if self._pattern is None:
+            return text
+        # split() alternates literal text and matched phrases
+        parts = self._pattern.split(text)
+        parts[1::2] = map(self.rules.__getitem__, parts[1::2])
+        return "".join(parts)
+
+    def rewrite_partial(self, text: str, start: int = 0, final: bool = False) -> Tuple[str, int]:
+        """
+        Rewrite text[start:] as far as it can be decided without seeing more input.
+
+        Returns the rewritten output and the index in `text` up to which input was
+        consumed. A match decision at position p needs the phrase plus one character
+        of lookahead, so everything before len(text) - max_key_length - 1 is final.
+        Characters before `start` are only used as lookbehind context. Trailing
+        whitespace is held back unless `final` is set, since it may turn out to be
+        the end of the message.
+        """
+        limit = len(text) if final else len(text) - self.max_key_length - 1
+        parts = []
+        pos = start
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text, start):
+                if match.start() >= limit:
+                    break
+                parts.append(text[pos:match.start()])
+                parts.append(self.rules[match.group(0)])
+                pos = match.end()
+        cut = max(pos, limit)
+        if not final:
+            while cut > pos and text[cut - 1].isspace():
+                cut -= 1
+        parts.append(text[pos:cut])
+        return "".join(parts), cut
+
+    def compose(self, after: "RewriteEngine") -> "RewriteEngine":
+        """
+        Engine equivalent to running this engine and then `after`, in one pass.
+        Rules of this engine win when both define the same phrase.
+        """
+        rules = dict(after.rules)
+        rules.update({key: after.rewrite(value) for key, value in self.rules.items()})
+        return RewriteEngine(rules)
+
+
+def load_rule_sets(path: Optional[str], defaults: Mapping[str, Mapping[str, str]]) -> Dict[str, Dict[str, str]]:
+    """
+    Load named rule sets from a JSON file of the form {"<set>": {"<phrase>": "<replacement>"}}.
+    Sets missing from the file keep their defaults; an unreadable file keeps all defaults.
+    """
+    rule_sets = {name: dict(rules) for name, rules in defaults.items()}
+    if not path:
+        return rule_sets
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load rewrite rules from {path}: {str(e)}")
+        return rule_sets
+    for name, rules in config.items():
+        if not isinstance(rules, dict):
+            logger.warning(f"Ignoring rewrite rule set '{name}' in {path}: expected an object")
+            continue
+        rule_sets[name] = {str(key): str(value) for key, value in rules.items()}
+    logger.info(f"Loaded rewrite rule sets {sorted(config)} from {path}")
+    return rule_sets
@@ -0,0 +1,185 @@
+# Compare HTML parser backends and full-page vs result-region parsing.
+#
+#   python -m benchmarks.bench_parsers
+#   python -m benchmarks.bench_parsers --platform Amazon --html amazon_response.html
+#
+# Timing runs in-process. Memory is measured in a fresh subprocess per
+# configuration (peak RSS growth while parsing one page) because selectolax and
+# lxml allocate outside the Python heap, where tracemalloc can't see them.
+from typing import Dict, List, Optional, Tuple
+import argparse
+import contextlib
+import io
+import json
+import resource
+import statistics
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import parsers
+from benchmarks.fixtures import PAGES
+
+PARSE_FUNCTIONS = {
+    "Amazon": parsers.parse_amazon,
+    "Flipkart": parsers.parse_flipkart,
+    "Myntra": parsers.parse_myntra,
+}
+
+# (backend, partial) - the first entry is the original html.parser full-page path
+CONFIGS = [
+    ("html.parser", False),
+    ("html.parser", True),
+    ("lxml", False),
+    ("lxml", True),
+    ("selectolax", False),
+    ("selectolax", True),
+]
+
+
+def load_page(platform: str, html_path: Optional[str]) -> str:
+    if html_path:
+        with open(html_path, encoding="utf-8") as f:
+            return f.read()
+    html, _ = PAGES[platform]()
+    return html
+
+
+def backend_available(backend: str) -> bool:
+    try:
+        parsers._ENGINE_FACTORIES[backend]()
+        return True
+    except ImportError:
+        return False
+
+
+def parse_quietly(platform: str, html: str, backend: str, partial: bool, max_results: int):
+    # The extractors print selector diagnostics; keep them out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        return PARSE_FUNCTIONS[platform](html, max_results, None, backend, partial)
+
+
+def time_config(platform: str, html: str, backend: str, partial: bool, iterations: int, max_results: int) -> Tuple[List[float], list]:
+    products = parse_quietly(platform, html, backend, partial, max_results)  # warm up
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        parse_quietly(platform, html, backend, partial, max_results)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, products
+
+
+def measure_memory(platform: str, backend: str, partial: bool, html_path: str, max_results: int) -> Optional[int]:
+    """Peak RSS growth in KB while parsing one page, measured in a fresh interpreter"""
+    cmd = [sys.executable, "-m", "benchmarks.bench_parsers", "--child", "--platform", platform,
+           "--backend", backend, "--max-results", str(max_results), "--html", html_path]
+    if partial:
+        cmd.append("--partial")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])["rss_growth_kb"]
+
+
+def _reset_peak_rss() -> bool:
+    # ru_maxrss survives fork/exec, so a child spawned from a big parent would start
+    # at the parent's peak. On Linux the high-water mark can be reset explicitly.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(args):
+    html = load_page(args.platform, args.html)
+    parsers.get_engine(args.backend)
+    _reset_peak_rss()
+    before = _peak_rss_kb()
+    parse_quietly(args.platform, html, args.backend, args.partial, args.max_results)
+    after = _peak_rss_kb()
+    print(json.dumps({"rss_growth_kb": after - before}))
+
+
+def run(args) -> List[Dict]:
+    platforms = [args.platform] if args.platform else list(PARSE_FUNCTIONS)
+    rows = []
+    for platform in platforms:
+        html = load_page(platform, args.html)
+        # The memory probe reads the page from disk so generating it doesn't inflate the peak
+        with tempfile.NamedTemporaryFile("w", suffix=".html", encoding="utf-8", delete=False) as f:
+            f.write(html)
+            page_path = f.name
+        print(f"\n{platform}: {len(html) / 1024:.0f} KB page, {args.iterations} iterations")
+        print(f"{'backend':<12} {'region':<7} {'median ms':>10} {'p95 ms':>8} {'speedup':>8} {'rss KB':>8} {'products':>9} {'same':>5}")
+        baseline_ms = None
+        baseline_products = None
+        for backend, partial in CONFIGS:
+            if not backend_available(backend):
+                print(f"{backend:<12} {'yes' if partial else 'no':<7} {'(not installed)':>10}")
+                continue
+            timings, products = time_config(platform, html, backend, partial, args.iterations, args.max_results)
+            median = statistics.median(timings)
+            p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+            if baseline_ms is None:
+                baseline_ms, baseline_products = median, products
+            rss_kb = measure_memory(platform, backend, partial, page_path, args.max_results)
+            row = {
+                "platform": platform,
+                "backend": backend,
+                "partial": partial,
+                "median_ms": round(median, 3),
+                "p95_ms": round(p95, 3),
+                "speedup": round(baseline_ms / median, 2) if median else None,
+                "rss_growth_kb": rss_kb,
+                "products": len(products),
+                "matches_baseline": products == baseline_products,
+            }
+            rows.append(row)
+            print(f"{backend:<12} {'yes' if partial else 'no':<7} {row['median_ms']:>10.2f} {row['p95_ms']:>8.2f} "
+                  f"{row['speedup']:>7.1f}x {rss_kb if rss_kb is not None else '-':>8} {row['products']:>9} {'yes' if row['matches_baseline'] else 'NO':>5}")
+        os.unlink(page_path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends used by the scrapers")
+    parser.add_argument("--platform", choices=list(PARSE_FUNCTIONS), help="Only benchmark one platform")
+    parser.add_argument("--html", help="Recorded results page to parse instead of the synthetic fixture (requires --platform)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--partial", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+    if args.html and not args.platform:
+        parser.error("--html requires --platform")
+
+    rows = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {len(rows)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
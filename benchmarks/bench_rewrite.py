@@ -0,0 +1,134 @@
+# Compare the compiled single-pass rewrite engine with the original str.replace chain.
+#
+#   python -m benchmarks.bench_rewrite
+#   python -m benchmarks.bench_rewrite --words 2000 --iterations 500
+#
+# Messages are synthetic but dense in rule phrases, so both implementations have
+# real work to do. The "legacy" column is the chain refine_human_like_text used
+# before the engine was introduced; the "config" rows grow the rule set the way a
+# rules file would, since the chain makes one pass per rule.
+from typing import Dict, List
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.message_generator import BASE_REWRITES, SLANG_REWRITES
+from app.text_rewrite import RewriteEngine
+
+FILLER = [
+    "hope", "this", "year", "brings", "joy", "and", "many", "happy", "moments", "with",
+    "the", "people", "who", "love", "most", "celebrate", "today", "always", "smile",
+    "Wednesday", "Someone", "wonderful", "memories", "together", "adventures",
+]
+PHRASES = list(BASE_REWRITES) + list(SLANG_REWRITES)
+PUNCTUATION = ["", "", "", "", ",", ".", "!"]
+
+
+def legacy_refine(text: str, slang: bool) -> str:
+    text = text.replace("We", "I").replace("One", "You")
+    text = text.replace("It is a pleasure", "I'm really happy").replace("Best wishes", "Wishing you all the best")
+    text = text.replace("I hope this message finds you well", "I just wanted to say")
+    if slang:
+        for word, replacement in SLANG_REWRITES.items():
+            text = text.replace(f" {word} ", f" {replacement} ")
+    return text
+
+
+def legacy_chain(rules: Dict[str, str]):
+    """The legacy slang loop generalised to an arbitrary rule set: one replace pass per rule"""
+    def refine(text: str) -> str:
+        for word, replacement in rules.items():
+            text = text.replace(f" {word} ", f" {replacement} ")
+        return text
+    return refine
+
+
+def extra_rules(count: int, seed: int = 0) -> Dict[str, str]:
+    rng = random.Random(seed)
+    rules = {}
+    while len(rules) < count:
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+        rules[word] = word[:3]
+    return rules
+
+
+def make_message(words: int, seed: int, vocabulary: List[str] = PHRASES) -> str:
+    rng = random.Random(seed)
+    out: List[str] = []
+    count = 0
+    while count < words:
+        token = rng.choice(vocabulary) if rng.random() < 0.2 else rng.choice(FILLER)
+        out.append(token + rng.choice(PUNCTUATION))
+        count += len(token.split())
+    return " ".join(out)
+
+
+def median_us(fn, messages: List[str], iterations: int) -> float:
+    fn(messages[0])  # warm up
+    timings = []
+    for i in range(iterations):
+        message = messages[i % len(messages)]
+        start = time.perf_counter()
+        fn(message)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def report(rows: List[Dict], name: str, rule_count: int, legacy_us: float, engine_us: float):
+    row = {
+        "rule_set": name,
+        "rules": rule_count,
+        "legacy_median_us": round(legacy_us, 2),
+        "engine_median_us": round(engine_us, 2),
+        "speedup": round(legacy_us / engine_us, 2) if engine_us else None,
+    }
+    rows.append(row)
+    print(f"{name:<14} {rule_count:>6} {row['legacy_median_us']:>10.1f} {row['engine_median_us']:>10.1f} {row['speedup']:>7.2f}x")
+
+
+def run(args) -> List[Dict]:
+    base = RewriteEngine(BASE_REWRITES)
+    slang = base.compose(RewriteEngine(SLANG_REWRITES))
+    messages = [make_message(args.words, seed) for seed in range(args.messages)]
+    print(f"{args.messages} messages of ~{args.words} words ({statistics.mean(map(len, messages)):.0f} chars), {args.iterations} iterations")
+    print(f"{'rule set':<14} {'rules':>6} {'legacy us':>10} {'engine us':>10} {'speedup':>8}")
+    rows: List[Dict] = []
+    report(rows, "base", len(base.rules),
+           median_us(lambda text: legacy_refine(text, False), messages, args.iterations),
+           median_us(base.rewrite, messages, args.iterations))
+    report(rows, "base+slang", len(slang.rules),
+           median_us(lambda text: legacy_refine(text, True), messages, args.iterations),
+           median_us(slang.rewrite, messages, args.iterations))
+
+    # The chain costs one pass per rule, the engine one pass per message
+    for count in args.rule_counts:
+        rules = {**SLANG_REWRITES, **extra_rules(count - len(SLANG_REWRITES))}
+        engine = RewriteEngine(rules)
+        sweep_messages = [make_message(args.words, seed, list(rules)) for seed in range(args.messages)]
+        report(rows, "config", len(rules),
+               median_us(legacy_chain(rules), sweep_messages, args.iterations),
+               median_us(engine.rewrite, sweep_messages, args.iterations))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message rewrite rules: compiled engine vs str.replace chain")
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rule-counts", type=int, nargs="*", default=[50, 200, 1000],
+                        help="Sizes of synthetic config rule sets to compare")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    rows = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {len(rows)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
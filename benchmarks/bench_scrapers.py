@@ -0,0 +1,251 @@
+# Benchmark the scrapers end to end over a corpus of search-results pages:
+# search_amazon/search_flipkart/search_myntra fetch each page through an injected
+# httpx transport, parse it in the parse pool and build products, exactly as in
+# production (minus the network, caches and rate limits).
+#
+#   python -m benchmarks.bench_scrapers
+#   python -m benchmarks.bench_scrapers --pages 100 --concurrency 4 --json scrapers.json
+#   python -m benchmarks.bench_scrapers --corpus recorded/ --baseline scrapers.json
+#
+# The corpus is the synthetic fixtures (several seeds per platform) plus, with
+# --corpus, recorded pages named amazon*.html, flipkart*.html or myntra*.html. A
+# recorded page is scored for accuracy when a sidecar <page>.json lists the
+# expected [title, price, url, image_url] rows in page order.
+#
+# Each platform runs in a fresh interpreter, so its peak RSS growth is not
+# skewed by the parser engines and pages of the platforms before it.
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmark runs must not read or write the node's persistent store
+os.environ["STORE_PATH"] = ""
+
+import httpx
+
+from app import parsers
+from app.ecommerce import EcommerceSearcher
+from app.http_clients import HttpClientPool
+from app.metrics import SEARCH_STAGE_SECONDS
+from app.parse_pool import ParsePool
+from app.rate_limit import PlatformLimiter
+from benchmarks.bench_parsers import _peak_rss_kb, _reset_peak_rss, backend_available
+from benchmarks.fixtures import PAGES
+
+STAGES = ("fetch", "parse", "select", "extract")
+
+# (name, html, expected products or None when unknown)
+Page = Tuple[str, str, Optional[List[Tuple]]]
+
+
+def load_corpus(platform: str, fixtures: int, corpus_dir: Optional[str]) -> List[Page]:
+    pages: List[Page] = []
+    for seed in range(fixtures):
+        html, expected = PAGES[platform](seed=seed)
+        pages.append((f"fixture-{seed}", html, expected))
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, f"{platform.lower()}*.html"))):
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+            expected = None
+            sidecar = os.path.splitext(path)[0] + ".json"
+            if os.path.exists(sidecar):
+                with open(sidecar, encoding="utf-8") as f:
+                    expected = [tuple(row) for row in json.load(f)]
+            pages.append((os.path.basename(path), html, expected))
+    return pages
+
+
+def make_transport(corpus: List[Page]) -> httpx.MockTransport:
+    """Serve corpus[i] for a search for "page <i>", whatever the platform's query parameter is called"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = request.url.params.get("k") or request.url.params.get("q") or ""
+        index = int(query.rsplit(" ", 1)[-1])
+        return httpx.Response(200, text=corpus[index % len(corpus)][1], headers={"Content-Type": "text/html; charset=utf-8"})
+    return httpx.MockTransport(handler)
+
+
+def score(products, expected: List[Tuple], max_results: int) -> Tuple[int, int, int]:
+    """(correct, extracted, expected) counting a product correct when title, price and URL all match"""
+    wanted = {(title, price, url) for title, price, url, _ in expected[:max_results]}
+    extracted = [(product.title, product.price, product.url) for product in products if not product.is_fallback]
+    return sum(1 for row in extracted if row in wanted), len(extracted), len(wanted)
+
+
+async def bench_platform(platform: str, corpus: List[Page], args) -> Dict:
+    searcher = EcommerceSearcher(
+        HttpClientPool(transport=make_transport(corpus)),
+        parse_pool=ParsePool(kind=args.pool, max_workers=args.workers),
+    )
+    # Raw scraper throughput: no outbound limits and plain product URLs to compare against
+    searcher.limiters[platform] = PlatformLimiter(platform, rate=0, initial_limit=args.concurrency, max_limit=args.concurrency)
+    searcher.amazon_tag = searcher.flipkart_tag = searcher.myntra_tag = None
+    search = {"Amazon": searcher.search_amazon, "Flipkart": searcher.search_flipkart, "Myntra": searcher.search_myntra}[platform]
+    searcher.clients.open((platform,))
+    searcher.parse_pool.start()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    totals = {"products": 0, "fallback_pages": 0, "correct": 0, "extracted": 0, "expected": 0}
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            products = await search(f"page {i}", args.max_results)
+            latencies.append((time.perf_counter() - started) * 1000)
+        totals["products"] += sum(1 for product in products if not product.is_fallback)
+        if any(product.is_fallback for product in products):
+            totals["fallback_pages"] += 1
+        expected = corpus[i % len(corpus)][2]
+        if expected is not None:
+            correct, extracted, wanted = score(products, expected, args.max_results)
+            totals["correct"] += correct
+            totals["extracted"] += extracted
+            totals["expected"] += wanted
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await one(0)  # warm up the parser engine, pool and client
+            latencies.clear()
+            totals.update(dict.fromkeys(totals, 0))
+            before = {stage: (SEARCH_STAGE_SECONDS.count(platform, stage), SEARCH_STAGE_SECONDS.total(platform, stage)) for stage in STAGES}
+            _reset_peak_rss()
+            rss_before = _peak_rss_kb()
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.pages)))
+            elapsed = time.perf_counter() - started
+            rss_peak = _peak_rss_kb()
+    finally:
+        await searcher.aclose()
+
+    stage_ms = {}
+    for stage in STAGES:
+        count = SEARCH_STAGE_SECONDS.count(platform, stage) - before[stage][0]
+        total = SEARCH_STAGE_SECONDS.total(platform, stage) - before[stage][1]
+        stage_ms[stage] = round(total / count * 1000, 3) if count else None
+    ordered = sorted(latencies)
+    return {
+        "platform": platform,
+        "pages": args.pages,
+        "corpus_pages": len(corpus),
+        "mean_page_kb": round(statistics.mean(len(html) for _, html, _ in corpus) / 1024, 1),
+        "pages_per_s": round(args.pages / elapsed, 1),
+        "products_per_s": round(totals["products"] / elapsed, 1),
+        "median_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 3),
+        "stage_mean_ms": stage_ms,
+        "peak_rss_growth_kb": rss_peak - rss_before,
+        "products": totals["products"],
+        "fallback_pages": totals["fallback_pages"],
+        "precision": round(totals["correct"] / totals["extracted"], 4) if totals["extracted"] else None,
+        "recall": round(totals["correct"] / totals["expected"], 4) if totals["expected"] else None,
+    }
+
+
+def measure_platform(platform: str, args) -> Dict:
+    """bench_platform's row for one platform, run in a fresh interpreter"""
+    cmd = [sys.executable, "-m", "benchmarks.bench_scrapers", "--child", "--platform", platform,
+           "--pages", str(args.pages), "--fixtures", str(args.fixtures), "--concurrency", str(args.concurrency),
+           "--pool", args.pool, "--workers", str(args.workers), "--max-results", str(args.max_results)]
+    if args.corpus:
+        cmd += ["--corpus", args.corpus]
+    # The child runs in the scratch directory, so point it back at the repo
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise SystemExit(f"Benchmark of {platform} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def child(args):
+    corpus = load_corpus(args.platform, args.fixtures, args.corpus)
+    print(json.dumps(asyncio.run(bench_platform(args.platform, corpus, args))))
+
+
+def load_baseline(path: Optional[str]) -> Dict[str, Dict]:
+    if not path:
+        return {}
+    with open(path) as f:
+        return {row["platform"]: row for row in json.load(f)["platforms"]}
+
+
+def run(args) -> Dict:
+    platforms = [args.platform] if args.platform else list(PAGES)
+    baseline = load_baseline(args.baseline)
+    backend = parsers.PARSER_BACKEND
+    if backend == "auto":
+        backend = next((name for name in ("selectolax", "lxml", "html.parser") if backend_available(name)), "auto")
+    print(f"{args.pages} pages per platform, concurrency {args.concurrency}, {args.pool} pool x{args.workers}, "
+          f"{backend} parser, max_results {args.max_results}")
+    print(f"{'platform':<9} {'pages/s':>8} {'products/s':>11} {'median ms':>10} {'p95 ms':>8} {'rss KB':>8} {'precision':>10} {'recall':>7} {'vs base':>8}")
+    rows = []
+    for platform in platforms:
+        row = measure_platform(platform, args)
+        previous = baseline.get(platform)
+        row["vs_baseline"] = round(row["pages_per_s"] / previous["pages_per_s"], 2) if previous and previous.get("pages_per_s") else None
+        rows.append(row)
+        print(f"{platform:<9} {row['pages_per_s']:>8.1f} {row['products_per_s']:>11.1f} {row['median_ms']:>10.2f} {row['p95_ms']:>8.2f} "
+              f"{row['peak_rss_growth_kb']:>8} {row['precision'] if row['precision'] is not None else '-':>10} "
+              f"{row['recall'] if row['recall'] is not None else '-':>7} "
+              f"{str(row['vs_baseline']) + 'x' if row['vs_baseline'] is not None else '-':>8}")
+        print(f"{'':<9} stages (mean ms): " + ", ".join(f"{stage} {ms}" for stage, ms in row["stage_mean_ms"].items()))
+    return {
+        "python": sys.version.split()[0],
+        "parser_backend": backend,
+        "partial_parse": parsers.PARTIAL_PARSE,
+        "pool": args.pool,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "max_results": args.max_results,
+        "platforms": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper extraction speed, memory and accuracy over a page corpus")
+    parser.add_argument("--platform", choices=list(PAGES), help="Only benchmark one platform")
+    parser.add_argument("--pages", type=int, default=50, help="Pages to scrape per platform (the corpus is cycled)")
+    parser.add_argument("--fixtures", type=int, default=5, help="Synthetic fixture pages per platform")
+    parser.add_argument("--corpus", help="Directory of recorded pages to add to the corpus")
+    parser.add_argument("--concurrency", type=int, default=1, help="Searches in flight at once")
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--baseline", help="Earlier --json output to compare pages/sec against")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Per-request httpx and pool lifecycle logs would swamp the report
+    logging.disable(logging.INFO)
+    for option in ("corpus", "baseline", "json"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    if args.child:
+        child(args)
+        return
+    with tempfile.TemporaryDirectory() as scratch:
+        # The scrapers write a debug dump of every page into the working directory;
+        # keep that part of the measured path but out of the repo
+        os.chdir(scratch)
+        result = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
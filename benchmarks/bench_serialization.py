@@ -0,0 +1,155 @@
+# Compare the product search response build: the original path (product dicts
+# validated through ProductSearchResponse, then jsonable_encoder and JSONResponse)
+# with the direct one (product dicts encoded once by FastJSONResponse).
+#
+#   python -m benchmarks.bench_serialization
+#   python -m benchmarks.bench_serialization --sizes 100,1000 --iterations 200 --json serialization.json
+#
+# Also reports the memory per product of the slotted ProductSearchResult against
+# the same class with a per-instance __dict__.
+from typing import Dict, List
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Importing the routes builds the shared searchers, which must not open the node's store
+os.environ["STORE_PATH"] = ""
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.ecommerce import ProductSearchResult
+from app.responses import FastJSONResponse, ORJSON_AVAILABLE
+from app.routes import _product_to_dict
+from app.schemas import ProductSearchResponse
+
+WORDS = ("Wireless", "Bluetooth", "Earbuds", "Noise", "Cancelling", "Smart", "Watch", "Steel", "Bottle", "Backpack",
+         "Laptop", "Stand", "LED", "Lamp", "Coffee", "Maker", "Yoga", "Mat", "Running", "Shoes")
+
+
+class DictProduct:
+    """ProductSearchResult as it was before it had __slots__"""
+
+    def __init__(self, title, price, url, platform, image_url=None, rating=None, reviews=None, is_fallback=False):
+        self.title = title
+        self.price = price
+        self.url = url
+        self.platform = platform
+        self.image_url = image_url
+        self.rating = rating
+        self.reviews = reviews
+        self.is_fallback = is_fallback
+
+
+def make_products(count: int, cls=ProductSearchResult, seed: int = 0) -> List:
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        platform = ("Amazon", "Flipkart")[i % 2]
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        products.append(cls(
+            title=title,
+            price=round(rng.uniform(199, 49999), 2),
+            url=f"https://www.{platform.lower()}.com/dp/B0{rng.randrange(10**8):08d}?tag=flagme-21",
+            platform=platform,
+            image_url=f"https://images.example.com/I/{rng.randrange(10**10)}.jpg",
+            rating=round(rng.uniform(3, 5), 1),
+            reviews=rng.randrange(5000),
+        ))
+    return products
+
+
+STATUS = {
+    platform: {"status": "ok", "count": 0, "elapsed_ms": 812.4, "detail": None, "source": "live"}
+    for platform in ("Amazon", "Flipkart")
+}
+
+
+def legacy_build(products: List) -> bytes:
+    content = {"products": [_product_to_dict(product) for product in products], "platform_status": STATUS}
+    # What FastAPI does with a dict returned from a route with a response_model
+    validated = ProductSearchResponse(**content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def direct_build(products: List) -> bytes:
+    content = {"products": [_product_to_dict(product) for product in products], "platform_status": STATUS, "next_cursor": None}
+    return FastJSONResponse(content).body
+
+
+def median_us(fn, products: List, iterations: int) -> float:
+    fn(products)  # warm up
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(products)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def bytes_per_product(cls, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    products = make_products(count, cls)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The field values are the same for both classes and cancel out in the comparison
+    del products
+    return (after - before) / count
+
+
+def run(args) -> Dict:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    encoder = "orjson" if ORJSON_AVAILABLE else "json"
+    print(f"{args.iterations} iterations per size, direct path encoded with {encoder}")
+    print(f"{'products':>9} {'legacy us':>10} {'direct us':>10} {'speedup':>8} {'us/product':>11} {'body KB':>8}")
+    rows = []
+    for size in sizes:
+        products = make_products(size)
+        legacy, direct = legacy_build(products), direct_build(products)
+        if json.loads(legacy) != json.loads(direct):
+            raise SystemExit(f"Responses differ for {size} products")
+        legacy_us = median_us(legacy_build, products, args.iterations)
+        direct_us = median_us(direct_build, products, args.iterations)
+        row = {
+            "products": size,
+            "legacy_us": round(legacy_us, 1),
+            "direct_us": round(direct_us, 1),
+            "speedup": round(legacy_us / direct_us, 2),
+            "direct_us_per_product": round(direct_us / size, 3),
+            "body_kb": round(len(direct) / 1024, 1),
+        }
+        rows.append(row)
+        print(f"{size:>9} {row['legacy_us']:>10.1f} {row['direct_us']:>10.1f} {row['speedup']:>7.2f}x "
+              f"{row['direct_us_per_product']:>11.3f} {row['body_kb']:>8.1f}")
+
+    memory = {
+        "slots_bytes": round(bytes_per_product(ProductSearchResult, args.memory_products), 1),
+        "dict_bytes": round(bytes_per_product(DictProduct, args.memory_products), 1),
+    }
+    print(f"\nMemory per product including field values ({args.memory_products} products): "
+          f"{memory['slots_bytes']:.0f} B with __slots__, {memory['dict_bytes']:.0f} B with __dict__")
+    return {"python": sys.version.split()[0], "encoder": encoder, "iterations": args.iterations, "sizes": rows, "memory": memory}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building product search responses")
+    parser.add_argument("--sizes", default="100,250,500,1000", help="Comma-separated product counts")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--memory-products", type=int, default=10000, help="Products to allocate for the memory comparison")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    result = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Measure cold-start cost: how long `import app.main` takes in a fresh interpreter,
+# and how long a freshly spawned uvicorn takes to answer /health with 200.
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --runs 10 --json startup.json
+#
+# Every run uses a new process, so nothing is shared with earlier runs apart
+# from the OS file cache (the first run is reported separately as the coldest).
+from typing import Dict, List, Optional
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'import_ms': elapsed * 1000, 'modules': len(sys.modules),"
+    " 'gemini_sdk_loaded': 'google.generativeai' in sys.modules}))\n"
+)
+
+
+def measure_import() -> Dict:
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_health(timeout: float) -> Optional[float]:
+    """Milliseconds from spawning uvicorn until GET /health returns 200"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return (time.perf_counter() - start) * 1000
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    return None
+                time.sleep(0.01)
+        return None
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def summarize(values: List[float]) -> Dict:
+    ordered = sorted(values)
+    return {
+        "first_ms": round(values[0], 1),
+        "median_ms": round(statistics.median(values), 1),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 1),
+        "min_ms": round(ordered[0], 1),
+    }
+
+
+def run(args) -> Dict:
+    imports = [measure_import() for _ in range(args.runs)]
+    import_ms = [probe["import_ms"] for probe in imports]
+    print(f"import app.main     ({args.runs} runs): median {statistics.median(import_ms):.0f} ms, "
+          f"first {import_ms[0]:.0f} ms, {imports[-1]['modules']} modules, "
+          f"Gemini SDK loaded: {'yes' if imports[-1]['gemini_sdk_loaded'] else 'no'}")
+
+    health_ms = []
+    for _ in range(args.runs):
+        elapsed = measure_first_health(args.timeout)
+        if elapsed is None:
+            print(f"Server did not become healthy within {args.timeout}s")
+            continue
+        health_ms.append(elapsed)
+    if health_ms:
+        print(f"spawn -> /health 200 ({len(health_ms)} runs): median {statistics.median(health_ms):.0f} ms, first {health_ms[0]:.0f} ms")
+
+    return {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import": summarize(import_ms),
+        "modules_loaded": imports[-1]["modules"],
+        "gemini_sdk_loaded_at_import": imports[-1]["gemini_sdk_loaded"],
+        "first_healthy": summarize(health_ms) if health_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app import time and time to first healthy /health")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for /health per run")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # The app must import from the repo root regardless of where this is launched
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Local stand-ins for Gemini and the storefronts, for load tests and offline runs:
+#
+#   python -m benchmarks.fake_servers --port 9100 --gemini-latency-ms 400 --gemini-tokens-per-s 80
+#
+# then start the app with
+#
+#   GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:9100 \
+#   AMAZON_BASE_URL=http://127.0.0.1:9100/amazon FLIPKART_BASE_URL=http://127.0.0.1:9100/flipkart \
+#   MYNTRA_BASE_URL=http://127.0.0.1:9100/myntra uvicorn app.main:app
+#
+# The fake Gemini speaks the REST generateContent/streamGenerateContent API the SDK
+# uses with a custom endpoint: it answers after the configured latency and then
+# emits text at the configured token rate (one word per token). Gift prompts get
+# five bulleted suggestions; anything else gets a message of the requested length.
+#
+# The fake storefronts serve the synthetic fixtures plus, with --corpus, recorded
+# pages (see bench_scrapers), choosing the page by a hash of the query (and results
+# page number) so the same search always gets the same page.
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import random
+import re
+import zlib
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.bench_scrapers import load_corpus
+
+WORDS = ("wishing", "you", "a", "day", "full", "of", "joy", "laughter", "and", "the", "people", "who", "love",
+         "you", "most", "here", "is", "to", "another", "year", "of", "adventures", "together")
+GIFTS = ("Sony WH-1000XM5 Headphones", "Kindle Paperwhite", "Fitbit Charge 6", "JBL Flip 6 Speaker", "Instax Mini 12 Camera")
+
+# streamGenerateContent with ?alt=json streams one JSON array, an element per chunk
+FINISH_STOP = 1
+
+
+def _candidate(text: str, finished: bool) -> Dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = FINISH_STOP
+    return {"candidates": [candidate]}
+
+
+def _answer(prompt: str) -> List[str]:
+    """The answer to a prompt as a list of tokens, each with its leading whitespace"""
+    if "gift products" in prompt:
+        return [token for i, gift in enumerate(GIFTS) for token in (("\n" if i else "") + "*", " " + gift)]
+    match = re.search(r"Length: (\d+) words", prompt)
+    words = int(match.group(1)) if match else 60
+    return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(words)]
+
+
+def gemini_routes(latency: float, tokens_per_s: float, chunk_tokens: int, jitter: float) -> List[Route]:
+    def first_byte_delay() -> float:
+        return max(0.0, random.gauss(latency, latency * jitter)) if jitter else latency
+
+    async def prompt_of(request: Request) -> str:
+        body = await request.json()
+        return "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+    async def generate(request: Request) -> Response:
+        tokens = _answer(await prompt_of(request))
+        await asyncio.sleep(first_byte_delay() + (len(tokens) / tokens_per_s if tokens_per_s > 0 else 0))
+        return JSONResponse(_candidate("".join(tokens), True))
+
+    async def stream(request: Request) -> Response:
+        tokens = _answer(await prompt_of(request))
+        chunks = ["".join(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
+
+        async def body():
+            await asyncio.sleep(first_byte_delay())
+            for i, chunk in enumerate(chunks):
+                if tokens_per_s > 0:
+                    await asyncio.sleep(chunk_tokens / tokens_per_s)
+                separator = "[" if i == 0 else ",\r\n"
+                yield separator + json.dumps(_candidate(chunk, i == len(chunks) - 1))
+            yield "]" if chunks else "[]"
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    return [
+        Route("/v1beta/models/{model}:generateContent", generate, methods=["POST"]),
+        Route("/v1beta/models/{model}:streamGenerateContent", stream, methods=["POST"]),
+    ]
+
+
+def storefront_routes(fixtures: int, corpus_dir, latency: float, error_rate: float) -> List[Route]:
+    routes = []
+    for platform, path in (("Amazon", "/amazon/s"), ("Flipkart", "/flipkart/search"), ("Myntra", "/myntra/search")):
+        corpus = [html for _, html, _ in load_corpus(platform, fixtures, corpus_dir)]
+
+        async def search(request: Request, corpus=corpus) -> Response:
+            query = request.query_params.get("k") or request.query_params.get("q") or ""
+            page = request.query_params.get("page") or request.query_params.get("p")
+            if page:
+                # Later results pages of a search get other pages of the corpus
+                query += f"#{page}"
+            if latency:
+                await asyncio.sleep(latency)
+            if error_rate and random.random() < error_rate:
+                return Response("Service Unavailable", status_code=503)
+            return HTMLResponse(corpus[zlib.crc32(query.encode()) % len(corpus)])
+
+        routes.append(Route(path, search, methods=["GET"]))
+    return routes
+
+
+def create_app(args) -> Starlette:
+    routes = gemini_routes(args.gemini_latency_ms / 1000, args.gemini_tokens_per_s, args.gemini_chunk_tokens, args.gemini_jitter)
+    routes += storefront_routes(args.fixtures, args.corpus, args.shop_latency_ms / 1000, args.shop_error_rate)
+    return Starlette(routes=routes)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--gemini-latency-ms", type=float, default=400, help="Time to the first Gemini token")
+    parser.add_argument("--gemini-tokens-per-s", type=float, default=80, help="Gemini output rate after the first token (0 for instant)")
+    parser.add_argument("--gemini-chunk-tokens", type=int, default=8, help="Tokens per streamed chunk")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2, help="Standard deviation of the latency as a fraction of it")
+    parser.add_argument("--shop-latency-ms", type=float, default=150, help="Storefront response time")
+    parser.add_argument("--shop-error-rate", type=float, default=0.0, help="Fraction of storefront requests answered with a 503")
+    parser.add_argument("--fixtures", type=int, default=5, help="Synthetic fixture pages per platform")
+    parser.add_argument("--corpus", help="Directory of recorded pages to serve as well")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Gemini API and fake Amazon/Flipkart/Myntra search pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Synthetic search-results pages shaped like the real Amazon/Flipkart/Myntra markup
+# the scrapers target. Real pages are mostly <head> scripts, styles and navigation,
+# with the result grid in the middle, so the generators pad both sides to a
+# realistic size. Each generator also returns the products it embedded so callers
+# can check extraction accuracy.
+from typing import List, Tuple
+import random
+
+ExpectedProduct = Tuple[str, float, str, str]
+
+WORDS = [
+    "wireless", "portable", "ring", "light", "bluetooth", "speaker", "smart", "watch",
+    "noise", "cancelling", "headphones", "stainless", "steel", "bottle", "leather",
+    "wallet", "yoga", "mat", "coffee", "maker", "backpack", "tripod", "kindle", "lamp",
+]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(4, 9)))
+
+
+def _head(rng: random.Random, size_kb: int) -> str:
+    chunks = ['<!doctype html><html lang="en-in"><head><meta charset="utf-8"><title>Search results</title>']
+    written = 0
+    while written < size_kb * 1024:
+        body = "".join(f"var v{rng.randint(0, 10**6)}=function(a,b){{return a<b?a:b}};" for _ in range(200))
+        chunks.append(f"<script>{body}</script>")
+        style = "".join(f".c{rng.randint(0, 10**6)}{{margin:{rng.randint(0, 9)}px;color:#{rng.randint(0, 0xffffff):06x}}}" for _ in range(150))
+        chunks.append(f"<style>{style}</style>")
+        written += len(body) + len(style)
+    chunks.append("</head>")
+    return "".join(chunks)
+
+
+def _nav(rng: random.Random, links: int) -> str:
+    items = "".join(f'<li class="nav-item"><a href="/nav/{i}" class="nav-a">{_title(rng)}</a></li>' for i in range(links))
+    return f'<header id="navbar"><ul class="nav-list">{items}</ul></header>'
+
+
+def _footer(rng: random.Random, links: int) -> str:
+    items = "".join(f'<li><a href="/help/{i}">{_title(rng)}</a></li>' for i in range(links))
+    return f'<div id="navFooter" class="navFooter"><ul>{items}</ul></div><footer class="desktop-footer"></footer></body></html>'
+
+
+def amazon_page(results: int = 48, seed: int = 0, head_kb: int = 900) -> Tuple[str, List[ExpectedProduct]]:
+    rng = random.Random(seed)
+    expected = []
+    cards = []
+    for i in range(results):
+        title = _title(rng)
+        price = float(rng.randint(199, 99999))
+        asin = f"B0{rng.randint(10**7, 10**8 - 1)}"
+        image = f"https://m.media-amazon.com/images/I/{asin}.jpg"
+        sponsored = i % 12 == 3
+        classes = "s-result-item s-asin sg-col-4-of-12 AdHolder" if sponsored else "s-result-item s-asin sg-col-4-of-12"
+        cards.append(
+            f'<div data-asin="{asin}" data-component-type="s-search-result" class="{classes}">'
+            f'<div class="sg-col-inner"><div class="s-card-container s-overflow-hidden">'
+            f'<div class="a-section"><span class="rush-component"><a class="a-link-normal s-no-outline" href="/dp/{asin}?ref=sr_1_{i}">'
+            f'<div class="a-section aok-relative s-image-fixed-height"><img class="s-image" src="{image}" alt="{title}"></div></a></span></div>'
+            f'<div class="a-section a-spacing-small"><h2 class="a-size-mini a-spacing-none"><a class="a-link-normal a-text-normal" href="/dp/{asin}?ref=sr_1_{i}">'
+            f'<span class="a-size-medium a-color-base a-text-normal">{title}</span></a></h2>'
+            f'<div class="a-row a-size-small"><span aria-label="4.{rng.randint(0, 9)} out of 5 stars"><i class="a-icon a-icon-star-small"></i></span>'
+            f'<span class="a-size-base s-underline-text">{rng.randint(10, 50000):,}</span></div>'
+            f'<div class="a-row"><span class="a-price" data-a-size="xl"><span class="a-offscreen">₹{price:,.0f}</span>'
+            f'<span aria-hidden="true"><span class="a-price-symbol">₹</span><span class="a-price-whole">{price:,.0f}</span></span></span></div>'
+            f'</div></div></div></div>'
+        )
+        if not sponsored:
+            expected.append((title, price, f"https://www.amazon.in/dp/{asin}?ref=sr_1_{i}", image))
+    body = (
+        f'<body>{_nav(rng, 300)}<div id="search"><div class="s-desktop-width-max">'
+        f'<div class="s-main-slot s-result-list s-search-results sg-row">{"".join(cards)}</div>'
+        f'<span data-component-type="s-pagination"><a href="/s?page=2">Next</a></span></div></div>{_footer(rng, 200)}'
+    )
+    return _head(rng, head_kb) + body, expected
+
+
+def flipkart_page(results: int = 40, seed: int = 0, head_kb: int = 600) -> Tuple[str, List[ExpectedProduct]]:
+    rng = random.Random(seed)
+    expected = []
+    cards = []
+    for i in range(results):
+        title = _title(rng)
+        price = float(rng.randint(199, 99999))
+        pid = f"itm{rng.randint(10**9, 10**10 - 1)}"
+        image = f"https://rukminim2.flixcart.com/image/312/312/{pid}.jpeg"
+        cards.append(
+            f'<div class="_1AtVbE col-12-12"><div class="_13oc-S"><div data-id="{pid}">'
+            f'<div class="_2kHMtA"><a class="_1fQZEK" href="/product/p/{pid}?pid={pid}">'
+            f'<div class="MIXNux"><img class="_396cs4" src="{image}" alt="{title}"></div>'
+            f'<div class="_3pLy-c row"><div class="col col-7-12"><div class="_4rR01T">{title}</div>'
+            f'<div class="gUuXy-"><span class="_1lRcqv"><div class="_3LWZlK">4.{rng.randint(0, 9)}</div></span></div></div>'
+            f'<div class="col col-5-12 nlI3QM"><div class="_3tbKJL"><div class="_25b18c"><div class="_30jeq3 _1_WHN1">₹{price:,.0f}</div></div></div></div></div>'
+            f'</a></div></div></div></div>'
+        )
+        expected.append((title, price, f"https://www.flipkart.com/product/p/{pid}?pid={pid}", image))
+    body = f'<body>{_nav(rng, 250)}<div class="_1YokD2 _3Mn1Gg">{"".join(cards)}</div>{_footer(rng, 150)}'
+    return _head(rng, head_kb) + body, expected
+
+
+def myntra_page(results: int = 50, seed: int = 0, head_kb: int = 500) -> Tuple[str, List[ExpectedProduct]]:
+    rng = random.Random(seed)
+    expected = []
+    cards = []
+    for i in range(results):
+        brand = rng.choice(["Roadster", "HRX", "Puma", "Levis", "Mango", "Nike"])
+        name = _title(rng)
+        price = float(rng.randint(299, 9999))
+        pid = rng.randint(10**7, 10**8 - 1)
+        image = f"https://assets.myntassets.com/h_720,q_90,w_540/{pid}.jpg"
+        cards.append(
+            f'<li class="product-base"><a data-refreshpage="true" target="_blank" href="/tshirts/{brand.lower()}/{pid}/buy">'
+            f'<div class="product-imageSliderContainer"><img src="{image}" class="img-responsive"></div>'
+            f'<div class="product-productMetaInfo"><h3 class="product-brand">{brand}</h3><h4 class="product-product">{name}</h4>'
+            f'<div class="product-price"><span><span class="product-discountedPrice">Rs. {price:.0f}</span></span></div></div></a></li>'
+        )
+        # Myntra's title joins brand and name, and both selectors match the same '.product-product' fallback chain
+        expected.append((f"{brand} - {name}", price, f"https://www.myntra.com/tshirts/{brand.lower()}/{pid}/buy", image))
+    body = (
+        f'<body>{_nav(rng, 200)}<div class="search-searchProductsContainer"><section>'
+        f'<ul class="results-base">{"".join(cards)}</ul></section></div>{_footer(rng, 100)}'
+    )
+    return _head(rng, head_kb) + body, expected
+
+
+PAGES = {
+    "Amazon": amazon_page,
+    "Flipkart": flipkart_page,
+    "Myntra": myntra_page,
+}
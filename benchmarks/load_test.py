@@ -0,0 +1,268 @@
+# Load-test the whole app against local fakes: starts benchmarks.fake_servers and
+# uvicorn pointed at them, then drives every endpoint with a fixed number of
+# concurrent clients (closed loop) and reports throughput and latency percentiles.
+#
+#   python -m benchmarks.load_test
+#   python -m benchmarks.load_test --concurrency 1,8,32,64 --duration 20 --workers 2
+#   python -m benchmarks.load_test --endpoints search,message_stream --mixed --json load.json
+#
+# Each concurrency level runs every selected endpoint on its own (or all of them at
+# once with --mixed), so the level where throughput stops growing and p99 takes
+# off is the endpoint's saturation point. Requests are all distinct by default,
+# which measures the uncached path; --distinct N cycles through N payloads per
+# endpoint to measure a warm cache instead.
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_servers import add_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = ("wireless earbuds", "gaming laptop", "smartwatch", "running shoes", "coffee maker", "backpack", "desk lamp", "yoga mat")
+OCCASIONS = ("birthday", "anniversary", "graduation", "wedding")
+RELATIONSHIPS = ("friend", "sister", "colleague", "father")
+INTERESTS = (["music", "travel"], ["fitness"], ["reading", "coffee"], ["gaming", "tech"])
+
+
+def _message(i: int) -> Dict:
+    return {"name": f"Guest {i}", "age": 20 + i % 50, "occasion": OCCASIONS[i % 4], "gender": "female" if i % 2 else "male",
+            "relationship": RELATIONSHIPS[i % 4], "length": 60}
+
+
+def _person(i: int) -> Dict:
+    return {"age": 20 + i % 50, "gender": "female" if i % 2 else "male", "interests": INTERESTS[i % 4] + [f"hobby {i}"],
+            "occasion": OCCASIONS[i % 4], "relationship": RELATIONSHIPS[i % 4], "min_budget": 500, "max_budget": 5000}
+
+
+# name -> (method, path, payload for the i-th request, response is streamed)
+ENDPOINTS: Dict[str, Tuple[str, str, Callable[[int], Optional[Dict]], bool]] = {
+    "health": ("GET", "/health", lambda i: None, False),
+    "search": ("POST", "/search-products", lambda i: {"query": f"{QUERIES[i % 8]} {i}"}, False),
+    "search_stream": ("POST", "/search-products/stream", lambda i: {"query": f"{QUERIES[i % 8]} {i}"}, True),
+    "gift_suggestions": ("POST", "/gift-suggestions", lambda i: {"person_details": _person(i)}, False),
+    "gift_recommendations": ("POST", "/gift-recommendations", lambda i: {"person_details": _person(i)}, False),
+    "message": ("POST", "/generate-message", _message, False),
+    "message_stream": ("POST", "/generate-message/stream", _message, True),
+    "messages_batch": ("POST", "/generate-messages", lambda i: {"items": [_message(i * 5 + j) for j in range(5)]}, False),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float, log_path: str):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}, see {log_path}")
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(url)).status_code < 500:
+                    return
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s, see {log_path}")
+
+
+@contextlib.asynccontextmanager
+async def servers(args, scratch: str):
+    """Start the fakes and the app under test; yields the app's base URL"""
+    fake_port, app_port = free_port(), free_port()
+    fakes_url = f"http://127.0.0.1:{fake_port}"
+    fake_args = [
+        "--port", str(fake_port),
+        "--gemini-latency-ms", str(args.gemini_latency_ms), "--gemini-tokens-per-s", str(args.gemini_tokens_per_s),
+        "--gemini-chunk-tokens", str(args.gemini_chunk_tokens), "--gemini-jitter", str(args.gemini_jitter),
+        "--shop-latency-ms", str(args.shop_latency_ms), "--shop-error-rate", str(args.shop_error_rate),
+        "--fixtures", str(args.fixtures),
+    ] + (["--corpus", args.corpus] if args.corpus else [])
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY="fake",
+        GEMINI_API_ENDPOINT=fakes_url,
+        AMAZON_BASE_URL=f"{fakes_url}/amazon",
+        FLIPKART_BASE_URL=f"{fakes_url}/flipkart",
+        MYNTRA_BASE_URL=f"{fakes_url}/myntra",
+        STORE_PATH=os.path.join(scratch, "store.sqlite3") if args.store else "",
+    )
+    if not args.keep_limits:
+        # The fakes don't need protecting; measure the app, not the outbound politeness settings
+        env.update(SCRAPE_RATE_PER_SECOND="0", SCRAPE_INITIAL_CONCURRENCY="64", SCRAPE_MAX_CONCURRENCY="256",
+                   HTTP_MAX_CONNECTIONS="256", HTTP_MAX_KEEPALIVE_CONNECTIONS="128")
+    processes = []
+    try:
+        for name, command in (
+            ("fakes", [sys.executable, "-m", "benchmarks.fake_servers"] + fake_args),
+            ("app", [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                     "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]),
+        ):
+            log_path = os.path.join(scratch, f"{name}.log")
+            log = open(log_path, "w")
+            # The app writes debug dumps of scraped pages into its working directory
+            process = subprocess.Popen(command, cwd=scratch, env=dict(env, PYTHONPATH=ROOT), stdout=log, stderr=subprocess.STDOUT)
+            processes.append((process, log))
+            url = f"http://127.0.0.1:{app_port}/health" if name == "app" else f"{fakes_url}/amazon/s"
+            await wait_ready(url, process, args.startup_timeout, log_path)
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process, log in reversed(processes):
+            process.terminate()
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                process.wait(10)
+            if process.poll() is None:
+                process.kill()
+            log.close()
+
+
+async def drive(client: httpx.AsyncClient, name: str, concurrency: int, duration: float, distinct: int, counter: List[int]) -> Dict:
+    """`concurrency` clients each sending requests back to back for `duration` seconds"""
+    method, path, payload, streamed = ENDPOINTS[name]
+    latencies: List[float] = []
+    first_chunks: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < deadline:
+            i = counter[0] = counter[0] + 1
+            body = payload(i % distinct if distinct else i)
+            started = time.perf_counter()
+            try:
+                first_chunk = None
+                async with client.stream(method, path, json=body) as response:
+                    async for _ in response.aiter_raw():
+                        if first_chunk is None:
+                            first_chunk = time.perf_counter() - started
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                else:
+                    latencies.append(elapsed)
+                    if streamed and first_chunk is not None:
+                        first_chunks.append(first_chunk)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        # Time to the first streamed chunk, what a user of the streaming endpoints waits for
+        "first_chunk_p50_ms": ms(percentile(sorted(first_chunks), 0.50)) if streamed else None,
+    }
+
+
+def print_row(row: Dict):
+    def cell(value) -> str:
+        return "-" if value is None else str(value)
+    errors = sum(row["errors"].values())
+    print(f"{row['endpoint']:<21} {row['concurrency']:>5} {row['requests']:>9} {errors:>7} {row['throughput_rps']:>9} "
+          f"{cell(row['p50_ms']):>9} {cell(row['p95_ms']):>9} {cell(row['p99_ms']):>9} {cell(row['max_ms']):>9} {cell(row['first_chunk_p50_ms']):>9}")
+
+
+async def run(args) -> Dict:
+    endpoints = args.endpoints.split(",") if args.endpoints else list(ENDPOINTS)
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints {unknown}; choose from {list(ENDPOINTS)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch:
+        async with servers(args, scratch) as base_url:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(levels) * len(endpoints))
+            async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+                print(f"App at {base_url} ({args.workers} worker(s)); Gemini {args.gemini_latency_ms:.0f}ms + "
+                      f"{args.gemini_tokens_per_s:g} tokens/s, storefronts {args.shop_latency_ms:.0f}ms, "
+                      f"{args.duration:g}s per run, {'mixed' if args.mixed else 'one endpoint at a time'}")
+                print(f"{'endpoint':<21} {'conc':>5} {'requests':>9} {'errors':>7} {'req/s':>9} "
+                      f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'first ms':>9}")
+                # One counter across endpoints and levels keeps payloads distinct, so endpoints
+                # sharing a cache (search and search_stream, the gift routes) don't warm it for each other
+                counter = [0]
+                for concurrency in levels:
+                    if args.mixed:
+                        results = await asyncio.gather(*(
+                            drive(client, name, concurrency, args.duration, args.distinct, counter) for name in endpoints
+                        ))
+                    else:
+                        results = [await drive(client, name, concurrency, args.duration, args.distinct, counter) for name in endpoints]
+                    for row in results:
+                        print_row(row)
+                        rows.append(row)
+    return {
+        "python": sys.version.split()[0],
+        "workers": args.workers,
+        "duration_s": args.duration,
+        "mixed": args.mixed,
+        "distinct": args.distinct,
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "gemini_tokens_per_s": args.gemini_tokens_per_s,
+        "shop_latency_ms": args.shop_latency_ms,
+        "shop_error_rate": args.shop_error_rate,
+        "results": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test every endpoint against local fake Gemini and storefront servers")
+    parser.add_argument("--endpoints", help=f"Comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels to run")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint and concurrency level")
+    parser.add_argument("--mixed", action="store_true", help="Drive all endpoints at once instead of one at a time")
+    parser.add_argument("--distinct", type=int, default=0, help="Cycle through this many payloads per endpoint (0: all distinct)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--store", action="store_true", help="Give the app a (scratch) persistent store")
+    parser.add_argument("--keep-limits", action="store_true", help="Keep the configured outbound rate and concurrency limits")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--json", help="Write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # Per-request httpx logs would swamp the report
+    logging.disable(logging.INFO)
+    if args.corpus:
+        args.corpus = os.path.abspath(args.corpus)
+    result = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ def test_search():
         print(f"Searching for: {query}")
         print(f"{'='*80}")
         
-        data = {"query": query}
+        data = {"query": query, "sort": "price_asc"}
         
         try:
             response = requests.post(url, headers=headers, json=data)
@@ -32,10 +32,7 @@ def test_search():
             
             if "products" in result:
                 products = result["products"]
-                print(f"\nFound {len(products)} products:\n")
-                
-                # Sort products by price
-                products.sort(key=lambda x: float(x['price']))
+                print(f"\nFound {len(products)} products (cheapest first):\n")
                 
                 for i, product in enumerate(products, 1):
                     print(f"{i}. {product['title'][:100]}...")
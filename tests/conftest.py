@@ -0,0 +1,4 @@
+import os
+
+# Tests must not open the node's persistent store
+os.environ["STORE_PATH"] = ""
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from app.cache import FRESH, MISS, STALE, TTLCache
+from app.store import SQLiteBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    store = SQLiteBackend(str(tmp_path / "store.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_fresh_then_stale_then_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(default_ttl=10, stale_ttl=20)
+    cache.set("k", "v")
+    assert cache.get("k") == ("v", FRESH)
+    now[0] += 15
+    assert cache.get("k") == ("v", STALE)
+    now[0] += 20
+    assert cache.get("k") == (None, MISS)
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (None, MISS)
+    assert cache.get("a") == (1, FRESH)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_persist_across_caches(backend):
+    writer = TTLCache(backend=backend, namespace="search", default_ttl=60)
+    writer.set(("query", "Amazon"), [1, 2])
+    backend.flush()
+    reader = TTLCache(backend=backend, namespace="search")
+    assert reader.get(("query", "Amazon")) == ([1, 2], FRESH)
+    assert reader.stats()["backend_hits"] == 1
+    # Namespaces are separate
+    assert TTLCache(backend=backend, namespace="gifts").get(("query", "Amazon")) == (None, MISS)
+
+
+def test_aget_reads_backend_off_the_loop(backend):
+    TTLCache(backend=backend, namespace="search", default_ttl=60).set("k", {"a": 1})
+    backend.flush()
+    reader = TTLCache(backend=backend, namespace="search")
+    assert asyncio.run(reader.aget("k")) == ({"a": 1}, FRESH)
+    # Now served locally
+    assert asyncio.run(reader.aget("k")) == ({"a": 1}, FRESH)
+    assert reader.stats()["backend_hits"] == 1
+
+
+def test_expiry_is_shared_through_the_backend(backend):
+    cache = TTLCache(backend=backend, namespace="search")
+    cache.set("stale", "s", ttl=0, stale_ttl=60)
+    cache.set("expired", "e", ttl=0, stale_ttl=0)
+    backend.flush()
+    reader = TTLCache(backend=backend, namespace="search")
+    assert reader.get("stale") == ("s", STALE)
+    assert reader.get("expired") == (None, MISS)
+    assert backend.compact() == 1
+
+
+def test_writes_do_not_block_the_caller(backend):
+    applied = []
+    slow_set = backend.set
+
+    def set_slowly(*args):
+        time.sleep(0.3)
+        slow_set(*args)
+        applied.append(args[1])
+
+    backend.set = set_slowly
+    cache = TTLCache(backend=backend, namespace="search")
+    started = time.perf_counter()
+    cache.set("k", 1)
+    assert time.perf_counter() - started < 0.1
+    backend.flush()
+    assert applied == ["k"]
+
+
+def test_backend_failures_are_counted_not_raised(backend):
+    def fail(*args):
+        raise RuntimeError("disk full")
+
+    backend.get = fail
+    backend.set = fail
+    cache = TTLCache(backend=backend, namespace="search")
+    cache.set("k", 1)
+    backend.flush()
+    assert cache.get("k") == (1, FRESH)
+    assert asyncio.run(cache.aget("missing")) == (None, MISS)
+    assert cache.stats()["backend_errors"] == 2
+
+
+def test_close_applies_queued_writes(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    store = SQLiteBackend(path)
+    TTLCache(backend=store, namespace="search", default_ttl=60).set("k", "v")
+    store.close()
+    reopened = SQLiteBackend(path)
+    try:
+        assert TTLCache(backend=reopened, namespace="search").get("k") == ("v", FRESH)
+    finally:
+        reopened.close()
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record(breaker.allow(), False, "HTTP 503")
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=3, reset_timeout=30)
+    breaker.record(breaker.allow(), False)
+    breaker.record(breaker.allow(), True)
+    breaker.record(breaker.allow(), False)
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == CLOSED
+    breaker.record(breaker.allow(), False, "HTTP 503")
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.retry_in() == 30
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=2, reset_timeout=30)
+    trip(breaker)
+    clock[0] += 30
+    probe = breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert probe is not None
+    assert breaker.allow() is None
+
+
+def test_probe_success_closes(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=2, reset_timeout=30)
+    trip(breaker)
+    clock[0] += 30
+    breaker.record(breaker.allow(), True)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=2, reset_timeout=30)
+    trip(breaker)
+    clock[0] += 30
+    breaker.record(breaker.allow(), False, "timeout")
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+    assert breaker.allow() is None
+
+
+def test_probe_without_outcome_frees_the_slot(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=2, reset_timeout=30)
+    trip(breaker)
+    clock[0] += 30
+    breaker.record(breaker.allow(), None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is not None
+
+
+def test_calls_admitted_before_opening_are_ignored(clock):
+    breaker = CircuitBreaker("Amazon", failure_threshold=2, reset_timeout=30)
+    slow = breaker.allow()
+    trip(breaker)
+    clock[0] += 30
+    probe = breaker.allow()
+
+    # The slow call finishing neither frees the probe slot nor decides the state
+    breaker.record(slow, True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+    breaker.record(slow, False)
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
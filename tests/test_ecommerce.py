@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import io
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+from app.ecommerce import EcommerceSearcher
+from app.http_clients import HttpClientPool
+from app.ranking import InvalidCursor
+from app.rate_limit import PlatformLimiter
+from benchmarks.fixtures import PAGES
+
+PLATFORMS = ("Amazon", "Flipkart", "Myntra")
+
+
+class Storefront:
+    """Serves fixture results pages, a different one per page number, and records the requested URLs"""
+
+    def __init__(self, results: int = 20, last_page: int = 3, seed=lambda page: page):
+        self.results = results
+        self.last_page = last_page
+        self.seed = seed
+        self.urls = []
+
+    def page_number(self, url: httpx.URL) -> int:
+        return int(url.params.get("page") or url.params.get("p") or 1)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.urls.append(request.url)
+        platform = next(name for name in PLATFORMS if name.lower() in request.url.host)
+        page = self.page_number(request.url)
+        if page > self.last_page:
+            return httpx.Response(200, text="<html><body></body></html>")
+        html, _ = PAGES[platform](results=self.results, seed=self.seed(page), head_kb=1)
+        return httpx.Response(200, text=html, headers={"Content-Type": "text/html; charset=utf-8"})
+
+    def requested(self, platform: str):
+        return [url for url in self.urls if platform.lower() in url.host]
+
+
+def run(storefront: Storefront, scenario):
+    """Run scenario(searcher) against the storefront, without rate limits or scraper logging"""
+    async def main():
+        searcher = EcommerceSearcher(HttpClientPool(transport=httpx.MockTransport(storefront)))
+        for platform in PLATFORMS:
+            searcher.limiters[platform] = PlatformLimiter(platform, rate=0, initial_limit=8, max_limit=8)
+        searcher.clients.open()
+        searcher.parse_pool.start()
+        try:
+            return await scenario(searcher)
+        finally:
+            await searcher.aclose()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    # the scrapers dump each raw response into the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def query_params(url: httpx.URL):
+    return parse_qs(urlsplit(str(url)).query)
+
+
+def test_amazon_sends_the_price_range_in_paise():
+    storefront = Storefront()
+    run(storefront, lambda searcher: searcher.search_amazon("bottle", min_price=99.5, max_price=2000))
+    run(storefront, lambda searcher: searcher.search_amazon("bottle", min_price=500))
+    run(storefront, lambda searcher: searcher.search_amazon("bottle"))
+    ranges = [query_params(url).get("rh") for url in storefront.urls]
+    assert ranges == [["p_36:9950-200000"], ["p_36:50000-"], None]
+
+
+def test_flipkart_sends_the_price_facet():
+    storefront = Storefront()
+    run(storefront, lambda searcher: searcher.search_flipkart("bottle", min_price=100, max_price=2000.5))
+    run(storefront, lambda searcher: searcher.search_flipkart("bottle", max_price=800))
+    facets = [query_params(url).get("p[]") for url in storefront.urls]
+    assert facets == [
+        ["facets.price_range.from=100", "facets.price_range.to=2001"],
+        ["facets.price_range.from=Min", "facets.price_range.to=800"],
+    ]
+
+
+def test_extraction_keeps_in_range_products_up_to_max_results():
+    products = run(Storefront(results=40), lambda searcher: searcher.search_myntra("kurta", max_results=5, min_price=500, max_price=2500))
+    assert 0 < len(products) <= 5
+    assert all(500 <= product.price <= 2500 and not product.is_fallback for product in products)
+
+
+def test_page_without_products_in_range_returns_no_placeholders():
+    products = run(Storefront(), lambda searcher: searcher.search_myntra("kurta", min_price=10 ** 7))
+    assert products == []
+
+
+def test_priced_search_reuses_the_unfiltered_first_page():
+    storefront = Storefront(results=40)
+
+    async def scenario(searcher):
+        await searcher.search_with_status("bottle", platforms={"Amazon"})
+        products, _ = await searcher.search_with_status("bottle", min_price=1, max_price=10 ** 6, platforms={"Amazon"})
+        return products, searcher.price_filter_counts
+
+    products, counts = run(storefront, scenario)
+    assert len(storefront.requested("Amazon")) == 1
+    assert counts == {"unfiltered_cache": 1, "upstream": 0}
+    assert len(products) == 10
+
+
+def page_numbers(storefront: Storefront, platform: str):
+    return sorted(storefront.page_number(url) for url in storefront.requested(platform))
+
+
+def test_results_page_urls():
+    storefront = Storefront()
+    run(storefront, lambda searcher: searcher.search_amazon("bottle", page=2))
+    run(storefront, lambda searcher: searcher.search_flipkart("bottle", page=3))
+    run(storefront, lambda searcher: searcher.search_myntra("bottle", page=4))
+    run(storefront, lambda searcher: searcher.search_myntra("bottle"))
+    assert [query_params(url).get("page") for url in storefront.urls[:2]] == [["2"], ["3"]]
+    assert query_params(storefront.urls[2]).get("p") == ["4"]
+    assert "p" not in query_params(storefront.urls[3])
+
+
+def test_deep_search_merges_concurrent_pages_in_order():
+    storefront = Storefront(results=20)
+
+    async def scenario(searcher):
+        searcher.page_sizes["Myntra"] = 20
+        merged = await searcher._search_platform_deep("Myntra", "kurta", 50)
+        pages = [await searcher.search_myntra("kurta", max_results=20, page=page) for page in (1, 2, 3)]
+        return merged, pages, dict(searcher.deep_counts)
+
+    merged, pages, counts = run(storefront, scenario)
+    assert [product.url for product in merged] == [product.url for page in pages for product in page][:50]
+    assert counts["pages"] == 3
+
+
+def test_deep_search_stops_at_an_empty_page():
+    storefront = Storefront(results=20, last_page=2)
+
+    async def scenario(searcher):
+        searcher.page_sizes["Myntra"] = 20
+        return await searcher._search_platform_deep("Myntra", "kurta", 100)
+
+    products = run(storefront, scenario)
+    assert len(products) == 40
+    assert 3 in page_numbers(storefront, "Myntra")
+
+
+def test_deep_search_counts_repeated_listings_once():
+    # every page serves the same listings, so page 2 adds nothing and ends the search
+    storefront = Storefront(results=20, seed=lambda page: 1)
+
+    async def scenario(searcher):
+        searcher.page_sizes["Myntra"] = 20
+        return await searcher._search_platform_deep("Myntra", "kurta", 40)
+
+    products = run(storefront, scenario)
+    assert len(products) == 20
+    assert len({product.url for product in products}) == 20
+
+
+def test_ordinary_search_reads_only_the_start_of_the_first_page():
+    async def scenario(searcher):
+        await searcher.search_with_status("bottle", platforms={"Amazon"})
+        cached, _ = searcher.search_cache.get(searcher._cache_key("bottle", "Amazon"))
+        return cached
+
+    assert len(run(Storefront(results=30), scenario)) == 10
+
+
+def test_deep_search_shares_the_first_page_with_ordinary_searches():
+    storefront = Storefront(results=30)
+
+    async def scenario(searcher):
+        searcher.page_sizes["Amazon"] = 30
+        deep, _ = await searcher.search_with_status("bottle", platforms={"Amazon"}, max_results=50)
+        first, _ = await searcher.search_with_status("bottle", platforms={"Amazon"})
+        return first, deep
+
+    first, deep = run(storefront, scenario)
+    assert page_numbers(storefront, "Amazon") == [1, 2]
+    assert len(first) == 10 and len(deep) == 50
+    assert [product.url for product in deep[:10]] == [product.url for product in first]
+
+
+def test_deep_search_reads_a_cut_short_first_page_in_full_once():
+    storefront = Storefront(results=30)
+
+    async def scenario(searcher):
+        searcher.page_sizes["Amazon"] = 30
+        first, _ = await searcher.search_with_status("bottle", platforms={"Amazon"})
+        deep, _ = await searcher.search_with_status("bottle", platforms={"Amazon"}, max_results=50)
+        again, _ = await searcher.search_with_status("bottle", platforms={"Amazon"}, max_results=50)
+        return first, deep, again
+
+    first, deep, again = run(storefront, scenario)
+    assert page_numbers(storefront, "Amazon") == [1, 1, 2]
+    assert len(deep) == 50 and [product.url for product in again] == [product.url for product in deep]
+    assert [product.url for product in deep[:10]] == [product.url for product in first]
+
+
+def test_priced_deep_search_ignores_a_warm_unfiltered_first_page():
+    def priced_deep(searcher):
+        searcher.page_sizes["Amazon"] = 60
+        return searcher.search_with_status("bottle", min_price=10000, max_price=40000, platforms={"Amazon"}, max_results=30)
+
+    cold, _ = run(Storefront(results=60), priced_deep)
+
+    async def warm(searcher):
+        await searcher.search_with_status("bottle", platforms={"Amazon"})
+        return await priced_deep(searcher)
+
+    storefront = Storefront(results=60)
+    products, _ = run(storefront, warm)
+    assert len(products) == 30
+    assert all(10000 <= product.price <= 40000 for product in products)
+    assert [product.url for product in products] == [product.url for product in cold]
+    assert all("rh" in query_params(url) for url in storefront.requested("Amazon")[1:])
+
+
+def test_search_page_cursor_is_tied_to_max_results():
+    async def scenario(searcher):
+        _, _, cursor = await searcher.search_page("bottle", platforms={"Amazon"}, limit=5)
+        with pytest.raises(InvalidCursor):
+            await searcher.search_page("bottle", platforms={"Amazon"}, limit=5, cursor=cursor, max_results=20)
+        page, _, _ = await searcher.search_page("bottle", platforms={"Amazon"}, limit=5, cursor=cursor, max_results=10)
+        return page
+
+    assert len(run(Storefront(results=30), scenario)) == 5
@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import TTLCache
+from app.message_generator import BASE_REWRITES, SLANG_REWRITES, MessageGenerator, StreamRefiner
+from app.text_rewrite import RewriteEngine
+
+RECIPIENT = ("Asha", 30, "birthday", "female", "friend", 20)
+
+
+class FakeModel:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(text=f"Happy birthday, message number {self.calls}.")
+
+
+def test_messages_are_not_cached_or_persisted_by_default(monkeypatch):
+    monkeypatch.delenv("MESSAGE_CACHE_TTL", raising=False)
+    model = FakeModel()
+    generator = MessageGenerator(model=model)
+    first = asyncio.run(generator.generate_personalized_message(*RECIPIENT))
+    second = asyncio.run(generator.generate_personalized_message(*RECIPIENT))
+    assert model.calls == 2
+    assert first != second
+    assert generator.cache.backend is None
+    assert len(generator.cache) == 0
+
+
+def test_identical_concurrent_requests_share_one_call():
+    model = FakeModel(delay=0.05)
+    generator = MessageGenerator(model=model)
+
+    async def both():
+        return await asyncio.gather(*(generator.generate_personalized_message(*RECIPIENT) for _ in range(2)))
+
+    first, second = asyncio.run(both())
+    assert model.calls == 1
+    assert first == second
+
+
+def test_opt_in_cache_reuses_messages():
+    model = FakeModel()
+    generator = MessageGenerator(model=model, cache=TTLCache(default_ttl=60))
+    first = asyncio.run(generator.generate_personalized_message(*RECIPIENT))
+    assert asyncio.run(generator.generate_personalized_message(*RECIPIENT)) == first
+    asyncio.run(generator.generate_personalized_message(*RECIPIENT, use_cache=False))
+    assert model.calls == 2
+
+
+SLANG = RewriteEngine(BASE_REWRITES).compose(RewriteEngine(SLANG_REWRITES))
+
+MESSAGES = [
+    "you up? u, you your young you",
+    "We hope your birthday is great because you are amazing, bro!",
+    "  Best wishes to you. See you later... see you later, talk to you later  ",
+    "oh my god, to be honest you're funny; youyou you\nyou",
+]
+
+
+def stream(refiner: StreamRefiner, chunks) -> str:
+    return "".join(refiner.feed(chunk) for chunk in chunks) + refiner.flush()
+
+
+@pytest.mark.parametrize("text", MESSAGES)
+def test_stream_refiner_matches_rewrite_for_every_two_and_three_way_split(text):
+    expected = SLANG.rewrite(text.strip())
+    for cuts in itertools.chain(itertools.combinations(range(1, len(text)), 1), itertools.combinations(range(1, len(text)), 2)):
+        bounds = (0,) + cuts + (len(text),)
+        chunks = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+        assert stream(StreamRefiner(SLANG), chunks) == expected, chunks
+
+
+def test_stream_refiner_matches_rewrite_for_random_chunkings():
+    rng = random.Random(7)
+    words = list(SLANG_REWRITES) + list(BASE_REWRITES) + ["u", "up", "yo", "young", "your", "yours", ",", ".", " ", "\n", "!"]
+    for _ in range(300):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 15)))
+        chunks, pos = [], 0
+        while pos < len(text):
+            step = rng.randint(1, 8)
+            chunks.append(text[pos:pos + step])
+            pos += step
+        assert stream(StreamRefiner(SLANG), chunks) == SLANG.rewrite(text.strip()), chunks
+
+
+def test_word_boundaries():
+    assert SLANG.rewrite("you up, u? you your yours young you") == "u up, u? u ur yours young u"
+    assert SLANG.rewrite("you.you!(you)") == "u.u!(u)"
+    assert SLANG.rewrite("youth bayou you_r") == "youth bayou you_r"
+
+
+def test_partial_match_is_held_back_across_chunks():
+    # "u" and "you" rewrite into each other, so releasing a prefix too early shows
+    engine = RewriteEngine({"u": "you", "you": "u", "your": "ur"})
+    expected = "see ur bag, you and u up"
+    refiner, released = StreamRefiner(engine), ""
+    for chunk in ["see yo", "u", "r bag, u", " and yo", "u", " up"]:
+        released += refiner.feed(chunk)
+        assert expected.startswith(released), released
+    assert released
+    assert released + refiner.flush() == expected
+
+
+def test_empty_and_whitespace_only_streams():
+    assert stream(StreamRefiner(SLANG), []) == ""
+    assert stream(StreamRefiner(SLANG), ["  ", "\n", " "]) == ""
+    assert stream(StreamRefiner(RewriteEngine({})), ["  we ", "go "]) == "we go"
@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+from app.ecommerce import ProductSearchResult
+from app.product_index import ProductIndex, tokenize
+
+
+def product(title, url, price=500.0, platform="Amazon", **extra):
+    return ProductSearchResult(title=title, price=price, url=url, platform=platform, **extra)
+
+
+CATALOGUE = [
+    product("Steel water bottle", "a", 500),
+    product("Steel bottle with steel lid", "b", 900, "Flipkart"),
+    product("Cotton kurta", "c", 700, "Myntra"),
+    product("Water jug", "d", 300),
+]
+
+
+def bm25(tf, df, length, total=4, average=3.0, k1=1.2, b=0.75):
+    idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+    return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+
+
+@pytest.fixture
+def index():
+    index = ProductIndex(max_documents=10)
+    assert index.add(CATALOGUE) == 4
+    return index
+
+
+def test_tokenize_strips_plurals():
+    assert tokenize("Steel Bottles, glass & 2 kids") == ["steel", "bottle", "glass", "2", "kid"]
+
+
+def test_bm25_ranks_by_hand_computed_scores(index):
+    # Title lengths 3, 5 ("with" counts), 2 and 2 tokens: average 3
+    hits = index.search("steel bottles")
+    assert [hit.product.url for hit in hits] == ["a", "b"]
+    assert hits[0].score == pytest.approx(bm25(1, 2, 3) * 2)
+    assert hits[1].score == pytest.approx(bm25(2, 2, 5) + bm25(1, 2, 5))
+    assert [hit.matched for hit in hits] == [1.0, 1.0]
+    water = index.search("water bottle")
+    assert [(hit.product.url, hit.matched) for hit in water] == [("a", 1.0), ("d", 0.5), ("b", 0.5)]
+
+
+def test_filters_apply_before_ranking(index):
+    assert [hit.product.url for hit in index.search("steel", max_price=600)] == ["a"]
+    assert [hit.product.url for hit in index.search("steel", platforms={"Flipkart"})] == ["b"]
+    assert [hit.product.url for hit in index.search("water", min_price=400, limit=1)] == ["a"]
+    assert index.search("sofa") == [] and index.search("") == []
+
+
+def test_reindexing_a_url_replaces_it_and_the_oldest_are_evicted(index):
+    assert index.add([product("Leather sofa", "a", 20000), product("Fallback", "e", is_fallback=True)]) == 0
+    assert [hit.product.url for hit in index.search("water")] == ["d"]
+    assert index.search("sofa")[0].product.price == 20000
+    index.max_documents = 2
+    index.add([product("Glass bottle", "f")])
+    assert len(index) == 2
+    assert [hit.product.url for hit in index.search("bottle")] == ["f"]
+    assert index.stats()["terms"] == len(set(tokenize("Leather sofa Glass bottle")))
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from app.ecommerce import ProductSearchResult
+from app.ranking import InvalidCursor, Ranker
+
+
+def product(title, price, platform="Amazon", url=None, rating=None, reviews=None, is_fallback=False):
+    return ProductSearchResult(title=title, price=price, url=url or f"https://{platform.lower()}.example/{title}/{price}",
+                               platform=platform, rating=rating, reviews=reviews, is_fallback=is_fallback)
+
+
+def catalogue(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        product(f"steel bottle {i}", round(rng.uniform(100, 2000), 2), ("Amazon", "Flipkart")[i % 2],
+                rating=round(rng.uniform(1, 5), 1), reviews=rng.randrange(5000))
+        for i in range(count)
+    ]
+
+
+def pages(ranker, products, sort, limit, query="steel bottle", context=()):
+    served, cursor = [], None
+    while True:
+        page, cursor = ranker.page(query, products, sort=sort, limit=limit, cursor=cursor, context=context)
+        served.append(page)
+        if cursor is None:
+            return served
+
+
+def test_keeps_cheapest_listing_of_a_cross_platform_duplicate():
+    amazon = product("Sony WH-1000XM5 Wireless Headphones Black", 26990, "Amazon")
+    flipkart = product("Sony WH-1000XM5 Wireless Headphones (Black)", 25990, "Flipkart")
+    other = product("Sony WH-CH520 Wireless Headphones", 3990, "Flipkart")
+    assert Ranker().deduplicate([amazon, flipkart, other]) == [other, flipkart]
+
+
+def test_keeps_same_platform_listings_and_distant_prices():
+    first = product("Steel Water Bottle 1 Litre", 499, "Amazon")
+    second = product("Steel Water Bottle 1 Litre", 549, "Amazon")
+    pricier = product("Steel Water Bottle 1 Litre", 999, "Flipkart")
+    assert len(Ranker().deduplicate([first, second, pricier])) == 3
+
+
+def test_drops_repeated_urls():
+    listing = product("Steel Water Bottle", 499, url="https://amazon.example/dp/1")
+    repeat = product("Steel Water Bottle", 499, url="https://amazon.example/dp/1")
+    assert len(Ranker().deduplicate([listing, repeat])) == 1
+
+
+@pytest.mark.parametrize("sort", ["relevance", "price_asc", "price_desc", "rating"])
+def test_pages_cover_the_full_ranking_once(sort):
+    ranker = Ranker(dedupe=False)
+    products = catalogue(37)
+    everything, cursor = ranker.page("steel bottle", products, sort=sort)
+    assert cursor is None
+    served = pages(ranker, products, sort, limit=10)
+    assert [len(page) for page in served] == [10, 10, 10, 7]
+    assert [p for page in served for p in page] == everything
+
+
+def test_price_sorts_and_placeholders_last():
+    placeholder = product("Amazon bottle Pro", 1.0, is_fallback=True)
+    products = catalogue(5) + [placeholder]
+    ranked, _ = Ranker(dedupe=False).page("bottle", products, sort="price_asc")
+    prices = [p.price for p in ranked[:-1]]
+    assert prices == sorted(prices)
+    assert ranked[-1] is placeholder
+
+
+def test_relevance_cursor_survives_changes_to_the_result_set():
+    ranker = Ranker(dedupe=False)
+    products = catalogue(30)
+    first, cursor = ranker.page("steel bottle", products, limit=10)
+    # Products outside the first page's price and review range would rescale every score
+    changed = products[5:] + [product("steel bottle cheap", 1, reviews=10 ** 6),
+                              product("steel bottle dear", 99999, "Flipkart")]
+    rest = []
+    while cursor:
+        page, cursor = ranker.page("steel bottle", changed, limit=10, cursor=cursor)
+        rest += page
+    served = {p.url for p in first}
+    assert not served & {p.url for p in rest}
+    assert {p.url for p in products[5:]} - served <= {p.url for p in rest}
+
+
+def test_rejects_cursors_from_other_searches():
+    ranker = Ranker(dedupe=False)
+    products = catalogue(20)
+    # (min_price, max_price, platforms, mode, max_results), as search_page builds it
+    context = (None, 1000, ["Amazon"], "live", 10)
+    _, cursor = ranker.page("steel bottle", products, limit=5, context=context)
+    with pytest.raises(InvalidCursor):
+        ranker.page("steel bottle", products, limit=5, cursor=cursor, context=(None, 2000, ["Amazon"], "live", 10))
+    with pytest.raises(InvalidCursor):
+        ranker.page("steel bottle", products, limit=5, cursor=cursor, context=(None, 1000, ["Amazon"], "live", 50))
+    with pytest.raises(InvalidCursor):
+        ranker.page("steel bottle", products, sort="rating", limit=5, cursor=cursor, context=context)
+    with pytest.raises(InvalidCursor):
+        ranker.page("steel bottle", products, limit=5, cursor="not-a-cursor", context=context)
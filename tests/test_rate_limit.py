@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app import rate_limit
+from app.ecommerce import EcommerceSearcher
+from app.http_clients import HttpClientPool
+from app.rate_limit import PlatformLimiter, QueueTimeout, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the limiter's clock; the event loop keeps the real one
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def send(limiter: PlatformLimiter) -> float:
+    return asyncio.run(limiter.acquire(timeout=0))
+
+
+def test_bucket_refills_at_its_rate_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve(0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve(0) is None
+    assert bucket.reserve(1) == 0.5
+    clock[0] += 0.5
+    assert bucket.tokens == 0
+    clock[0] += 1
+    assert bucket.tokens == 2
+    clock[0] += 60
+    assert bucket.tokens == 3
+
+
+def test_zero_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.reserve(0) == 0.0 for _ in range(100))
+
+
+def test_rate_wait_beyond_the_timeout_fails(clock):
+    limiter = PlatformLimiter("Amazon", rate=1, burst=1)
+    send(limiter)
+    with pytest.raises(QueueTimeout):
+        asyncio.run(limiter.acquire(timeout=0.5))
+    assert limiter.stats()["queue_timeouts"] == 1
+
+
+def test_failures_halve_the_limit_once_per_burst(clock):
+    limiter = PlatformLimiter("Amazon", rate=0, initial_limit=8, min_limit=1)
+    burst = [send(limiter) for _ in range(3)]
+    clock[0] += 1
+    for sent_at in burst:
+        limiter.release(sent_at, False)
+    assert limiter.limit == 4
+    for expected in (2, 1, 1):
+        clock[0] += 1
+        limiter.release(send(limiter), False)
+        assert limiter.limit == expected
+    assert limiter.decreases == 4
+
+
+def test_cancelled_requests_leave_the_limit_alone(clock):
+    limiter = PlatformLimiter("Amazon", rate=0, initial_limit=8)
+    limiter.release(send(limiter), None)
+    assert limiter.limit == 8 and limiter.inflight == 0
+
+
+def test_latency_spike_halves_the_limit(clock):
+    limiter = PlatformLimiter("Amazon", rate=0, initial_limit=8, latency_factor=2.5, latency_floor=1.0)
+    limiter.release(send(limiter), True, 0.2)
+    # Slower than the factor allows, but under the floor
+    limiter.release(send(limiter), True, 0.9)
+    assert limiter.limit == 8
+    limiter.release(send(limiter), True, 3.0)
+    assert limiter.limit == 4
+
+
+def test_limit_grows_back_to_the_ceiling_only_while_saturated(clock):
+    limiter = PlatformLimiter("Amazon", rate=0, initial_limit=2, max_limit=6)
+    # One request at a time only counts as saturated while the limit is at most 2
+    for _ in range(50):
+        limiter.release(send(limiter), True, 0.1)
+    assert limiter.limit < 3
+    rounds = 0
+    while limiter.limit < limiter.max_limit:
+        sent = [send(limiter) for _ in range(int(limiter.limit))]
+        for sent_at in sent:
+            limiter.release(sent_at, True, 0.1)
+        rounds += 1
+        assert rounds < 50
+    # About one step per limit's worth of successes
+    assert rounds >= 4
+    for _ in range(10):
+        for sent_at in [send(limiter) for _ in range(6)]:
+            limiter.release(sent_at, True, 0.1)
+    assert limiter.limit == 6
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_throttling_responses_cut_the_limit(status):
+    async def main():
+        searcher = EcommerceSearcher(HttpClientPool(transport=httpx.MockTransport(lambda request: httpx.Response(status))))
+        searcher.limiters["Amazon"] = PlatformLimiter("Amazon", rate=0, initial_limit=8)
+        searcher.clients.open()
+        try:
+            response = await searcher._fetch("Amazon", "https://www.amazon.in/s?k=bottle")
+        finally:
+            await searcher.aclose()
+        return response.status_code, searcher.limiters["Amazon"]
+
+    code, limiter = asyncio.run(main())
+    assert code == status
+    assert limiter.limit == 4 and limiter.inflight == 0
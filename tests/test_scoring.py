@@ -0,0 +1,51 @@
+import csv
+from datetime import datetime
+
+import pytest
+
+from app.scoring import CATEGORY_COLUMNS, FEATURE_COLUMNS, GiftScorer
+
+JANUARY = datetime(2026, 1, 15)
+
+
+def row(brand, gender, holiday, price, median_price, **features):
+    record = {column: features.get(name, 0.0) for name, column in FEATURE_COLUMNS.items()}
+    record[FEATURE_COLUMNS["price"]] = price
+    record[FEATURE_COLUMNS["median_price"]] = median_price
+    record.update({CATEGORY_COLUMNS["brand"]: brand, CATEGORY_COLUMNS["gender"]: gender,
+                   CATEGORY_COLUMNS["holiday"]: holiday, CATEGORY_COLUMNS["season"]: "winter",
+                   CATEGORY_COLUMNS["geography"]: "plains"})
+    return record
+
+
+@pytest.fixture
+def scorer(tmp_path):
+    path = tmp_path / "content.csv"
+    records = [
+        # Rs 1081 (0.1 of 90..10000) against a median of Rs 1100 (of 100..19000)
+        row("PUMA", "male", "No", 0.1, 1000 / 18900, recommend_probability=0.5, rating=0.8,
+            sentiment=0.6, similar_rating=0.4, clicks=0.2, purchases=0.1),
+        row("Lee", "female", "Yes", 0.0, 0.0, rating=0.6),
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+    return GiftScorer(str(path))
+
+
+def test_score_matches_hand_computation(scorer):
+    profile = {"gender": "man", "occasion": "diwali", "interests": ["puma shoes"]}
+    scores = scorer.score(profile, now=JANUARY)
+    quality = 0.35 * 0.5 + 0.2 * 0.8 + 0.15 * 0.6 + 0.1 * 0.4 + 0.1 * 0.2 + 0.1 * 0.1
+    # gender, winter, brand mentioned, then price fit: Rs 19 apart over a Rs 9910 range
+    expected = quality + 0.25 + 0.1 + 0.5 + 0.15 * (1 - 19 / 9910)
+    assert scores[0] == pytest.approx(expected, rel=1e-5)
+    # holiday (Yes for diwali), winter, Rs 90 against a median of Rs 100
+    assert scores[1] == pytest.approx(0.2 * 0.6 + 0.1 + 0.1 + 0.15 * (1 - 10 / 9910), rel=1e-5)
+
+
+def test_budget_excludes_rows_outside_it(scorer):
+    assert [brand["brand"] for brand in scorer.rank_brands({"gender": "man"}, now=JANUARY)] == ["PUMA", "Lee"]
+    brands = scorer.rank_brands({"gender": "man", "max_budget": 1000}, now=JANUARY)
+    assert [(brand["brand"], brand["price"]) for brand in brands] == [("Lee", 90.0)]
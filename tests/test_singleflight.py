@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, delay: float = 0.02, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"result {self.calls}"
+
+
+def test_concurrent_identical_calls_run_once():
+    flight, upstream = SingleFlight("test"), Upstream()
+
+    async def main():
+        shared = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+        other = await flight.do("other", upstream)
+        return shared, other
+
+    shared, other = asyncio.run(main())
+    assert shared == ["result 1"] * 5
+    assert other == "result 2"
+    assert flight.stats() == {"calls": 6, "executed": 2, "collapsed": 4, "in_flight": 0}
+
+
+def test_failure_is_shared_and_cleared():
+    error = ValueError("upstream down")
+    flight, upstream = SingleFlight("test"), Upstream(error=error)
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)), return_exceptions=True)
+        assert flight.stats()["in_flight"] == 0
+        upstream.error = None
+        return results, await flight.do("k", upstream)
+
+    results, retry = asyncio.run(main())
+    assert results == [error] * 3
+    assert retry == "result 2"
+    assert upstream.calls == 2
+
+
+def test_one_cancelled_caller_does_not_cancel_the_others():
+    flight, upstream = SingleFlight("test"), Upstream()
+
+    async def main():
+        first = asyncio.create_task(flight.do("k", upstream))
+        second = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "result 1"
+    assert upstream.cancelled == 0
+
+
+def test_call_is_cancelled_and_cleared_once_every_caller_is():
+    flight, upstream = SingleFlight("test"), Upstream(delay=10)
+
+    async def main():
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert flight.stats()["in_flight"] == 0
+        upstream.delay = 0
+        return await flight.do("k", upstream)
+
+    assert asyncio.run(main()) == "result 2"
+    assert upstream.cancelled == 1
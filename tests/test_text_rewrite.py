@@ -0,0 +1,62 @@
+import json
+import random
+import re
+import string
+
+from app.message_generator import BASE_REWRITES, SLANG_REWRITES
+from app.text_rewrite import PREFIX_SCAN_MAX_CHARS, RewriteEngine, load_rule_sets
+
+
+def sequential(rules, text: str) -> str:
+    """One whole-word re.sub per rule, longest phrase first"""
+    for key in sorted(rules, key=len, reverse=True):
+        text = re.sub(r"(?<!\w)%s(?!\w)" % re.escape(key), lambda _: rules[key], text)
+    return text
+
+
+def test_longest_match_wins():
+    engine = RewriteEngine({"see": "A", "see you": "B", "see you later": "C"})
+    assert engine.rewrite("see you later, see you, see it, see you lately") == "C, B, A it, B lately"
+
+
+def test_longest_match_wins_with_many_first_characters():
+    # More distinct first characters than PREFIX_SCAN_MAX_CHARS switches to a leading word check
+    rules = {char: char.upper() for char in string.ascii_lowercase[:PREFIX_SCAN_MAX_CHARS + 1]}
+    rules.update({"a b": "X", "a b c": "Y"})
+    engine = RewriteEngine(rules)
+    assert engine.rewrite("a b c, a b, a, ab, pa") == "Y, X, A, ab, pa"
+
+
+def test_matching_is_case_sensitive():
+    engine = RewriteEngine(BASE_REWRITES)
+    assert engine.rewrite("We said we would. WE did.") == "I said we would. WE did."
+    assert RewriteEngine(SLANG_REWRITES).rewrite("You and you") == "You and u"
+
+
+def test_compose_prefers_the_first_engines_rules():
+    first = RewriteEngine({"hi there": "hello", "bye": "ciao"})
+    after = RewriteEngine({"hi": "yo", "hello": "hey", "bye": "later"})
+    composed = first.compose(after)
+    assert composed.rules == {"hi there": "hey", "bye": "ciao", "hi": "yo", "hello": "hey"}
+    assert composed.rewrite("hi there, hi, bye, hello") == "hey, yo, ciao, hey"
+
+
+def test_composed_slang_matches_sequential_rewrites():
+    composed = RewriteEngine(BASE_REWRITES).compose(RewriteEngine(SLANG_REWRITES))
+    rng = random.Random(11)
+    words = list(BASE_REWRITES) + list(SLANG_REWRITES) + ["hello", "yourself", "We're", "Ones", "day"]
+    separators = [" ", ", ", ". ", "! ", "\n", "-"]
+    for _ in range(500):
+        text = "".join(rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(1, 12)))
+        assert composed.rewrite(text) == sequential(SLANG_REWRITES, sequential(BASE_REWRITES, text)), text
+
+
+def test_rule_sets_fall_back_to_defaults(tmp_path):
+    defaults = {"base": {"We": "I"}, "slang": {"you": "u"}}
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"slang": {"great": "lit"}, "extra": {"a": 1}, "broken": ["x"]}))
+    assert load_rule_sets(str(path), defaults) == {"base": {"We": "I"}, "slang": {"great": "lit"}, "extra": {"a": "1"}}
+    assert load_rule_sets(None, defaults) == defaults
+    assert load_rule_sets(str(tmp_path / "missing.json"), defaults) == defaults
+    path.write_text("{not json")
+    assert load_rule_sets(str(path), defaults) == defaults